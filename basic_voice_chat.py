@@ -10,21 +10,21 @@ import sys
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 import threading
-import pathlib
-
-# 确保必要的目录存在
-os.makedirs("data", exist_ok=True)
 
 # 导入必要的音频处理模块
 try:
     from voice_assistant.audio_player import play_audio, stop_audio
     from voice_assistant.text_to_speech import synthesize_speech
     from voice_assistant.ai_service import generate_response
+    from voice_assistant.paths import DATA_DIR
 except ImportError as e:
     print(f"错误: 无法导入基础模块: {e}")
     input("按Enter键退出...")
     sys.exit(1)
 
+# 确保必要的目录存在
+DATA_DIR.mkdir(exist_ok=True)
+
 class BasicVoiceChat(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -159,7 +159,7 @@ class BasicVoiceChat(tk.Tk):
             # 生成语音回复
             self.conversation_count += 1
             mp3_filename = f"response_{self.conversation_count}.mp3"
-            file_path = pathlib.Path("data") / mp3_filename
+            file_path = DATA_DIR / mp3_filename
             
             # 合成语音
             success = synthesize_speech(response, str(file_path))
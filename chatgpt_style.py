@@ -10,7 +10,6 @@ import os
 import sys
 import time
 import threading
-import pathlib
 import pygame
 import customtkinter as ctk
 from dotenv import load_dotenv
@@ -19,6 +18,7 @@ from dotenv import load_dotenv
 from voice_assistant.speech_handler import record_and_transcribe
 from voice_assistant.text_to_speech import synthesize_speech
 from voice_assistant.ai_service import generate_response
+from voice_assistant.paths import DATA_DIR
 
 # 设置主题
 ctk.set_appearance_mode("System")  # 使用系统主题
@@ -41,7 +41,7 @@ CHATGPT_COLORS = {
 load_dotenv()
 
 # 创建数据目录
-data_dir = pathlib.Path("data")
+data_dir = DATA_DIR
 data_dir.mkdir(exist_ok=True)
 
 # 初始化pygame混音器（用于音频播放）
@@ -504,7 +504,7 @@ class ChatGPTStyleApp(ctk.CTk):
         """播放生成的语音"""
         try:
             # 获取音频文件完整路径
-            audio_path = str(pathlib.Path("data") / mp3_filename)
+            audio_path = str(DATA_DIR / mp3_filename)
             
             # 确保文件存在
             if not os.path.exists(audio_path):
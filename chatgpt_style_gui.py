@@ -30,6 +30,7 @@ else:
 
 from voice_assistant.text_to_speech import synthesize_speech
 from voice_assistant.ai_service import generate_response
+from voice_assistant.paths import DATA_DIR
 
 # Load environment variables
 load_dotenv()
@@ -200,7 +201,7 @@ class VoiceAssistantApp(ctk.CTk):
         self._setup_ui()
         
         # Ensure data directory exists
-        data_dir = pathlib.Path("data")
+        data_dir = DATA_DIR
         data_dir.mkdir(exist_ok=True)
         
         # Add welcome message
@@ -456,7 +457,7 @@ class VoiceAssistantApp(ctk.CTk):
                 self.after(0, lambda: self.set_status("正在播放语音..."))
                 
                 # Play the audio
-                audio_path = pathlib.Path("data") / mp3_filename
+                audio_path = DATA_DIR / mp3_filename
                 if os.path.exists(audio_path):
                     try:
                         os.startfile(audio_path)
@@ -9,7 +9,6 @@
 import os
 import sys
 import time
-import pathlib
 import pygame
 import platform
 from dotenv import load_dotenv
@@ -18,12 +17,13 @@ from dotenv import load_dotenv
 from voice_assistant.real_speech_to_text import record_and_transcribe
 from voice_assistant.text_to_speech import synthesize_speech
 from voice_assistant.ai_service import generate_response
+from voice_assistant.paths import DATA_DIR
 
 # 加载环境变量
 load_dotenv()
 
 # 创建数据目录
-data_dir = pathlib.Path("data")
+data_dir = DATA_DIR
 data_dir.mkdir(exist_ok=True)
 
 # 初始化pygame音频
@@ -118,11 +118,10 @@ def voice_chat_loop():
         # 转换为语音并直接播放
         print("正在生成语音回复...")
         audio_file = f"response_{count}.mp3"
-        success = synthesize_speech(ai_response, audio_file)
+        audio_path = synthesize_speech(ai_response, audio_file)
         
-        if success:
+        if audio_path:
             # 直接在当前窗口播放音频
-            audio_path = str(data_dir / audio_file)
             direct_play(audio_path)
         else:
             print("语音生成失败，无法播放")
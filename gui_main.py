@@ -24,6 +24,7 @@ from dotenv import load_dotenv
 from voice_assistant.real_speech_to_text import record_and_transcribe
 from voice_assistant.text_to_speech import synthesize_speech
 from voice_assistant.ai_service import generate_response
+from voice_assistant.paths import DATA_DIR
 
 # Load environment variables
 load_dotenv()
@@ -124,7 +125,7 @@ class VoiceAssistantApp(tk.Tk):
         self._setup_ui()
         
         # Ensure data directory exists
-        data_dir = pathlib.Path("data")
+        data_dir = DATA_DIR
         data_dir.mkdir(exist_ok=True)
         
         # Print welcome message to chat
@@ -452,7 +453,7 @@ class VoiceAssistantApp(tk.Tk):
                 self.after(0, lambda: self.status_bar.set_status("正在播放语音..."))
                 
                 # Play the audio
-                audio_path = pathlib.Path("data") / mp3_filename
+                audio_path = DATA_DIR / mp3_filename
                 if os.path.exists(audio_path):
                     try:
                         os.startfile(audio_path)
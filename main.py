@@ -10,42 +10,285 @@ This script provides both text-based and voice-based conversation modes.
 """
 import os
 import sys
-import io
+import re
 import time
-import pathlib
-import pygame
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from dotenv import load_dotenv
+from voice_assistant.paths import DATA_DIR
+from voice_assistant.commands import EXIT_RE
 
-# Import voice assistant modules
-from voice_assistant.real_speech_to_text import record_and_transcribe
-from voice_assistant.text_to_speech import synthesize_speech
-from voice_assistant.ai_service import generate_response
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
 
 # Load environment variables
 load_dotenv()
 
-# Initialize pygame mixer for audio playback
-pygame.mixer.init()
+# pygame and the voice modules are imported on first use, so text mode starts
+# quickly and never opens the audio device; _init_audio() fills these in
+pygame = None
+VOICE_CHANNEL = None
+
+# Same data directory the voice modules use, independent of the cwd
+_DATA_DIR = DATA_DIR
+_DATA_DIR.mkdir(exist_ok=True)
 
 # 设置控制台编码
 try:
-    # 使用subprocess调用命令设置Windows控制台代码页为UTF-8
-    if os.name == 'nt':
-        os.system("chcp 65001 >nul")
+    # 直接调用Win32 API设置控制台代码页为UTF-8（无需启动cmd子进程），仅在交互式控制台下执行
+    if os.name == 'nt' and sys.stdout.isatty():
+        import ctypes
+        ctypes.windll.kernel32.SetConsoleOutputCP(65001)
+        ctypes.windll.kernel32.SetConsoleCP(65001)
     # 设置标准输入输出流编码
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-    sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stdin.reconfigure(encoding='utf-8', errors='replace')
 except Exception as e:
     print(f"警告: 无法设置编码: {e}")
     # 继续运行
 
 
+def _init_audio():
+    """Import pygame and set up the mixer and voice channel (once per process)."""
+    global pygame, VOICE_CHANNEL
+    if pygame is not None:
+        return
+    import pygame as _pygame
+    
+    # Initialize pygame mixer for audio playback; a fixed format and a larger
+    # buffer avoid renegotiation and underrun dropouts under CPU load
+    _pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=4096)
+    _pygame.mixer.init()
+    
+    # Replies play on a dedicated channel so consecutive clips can be queued gaplessly
+    _pygame.mixer.set_reserved(1)
+    VOICE_CHANNEL = _pygame.mixer.Channel(0)
+    
+    pygame = _pygame
+
+
+# Marks the end of one assistant turn in the speech queue
+_TURN_END = object()
+
+
+# Reply clips rotate through a fixed set of files instead of one new file per sentence.
+# Clips are decoded into memory when queued, and at most a few are in flight at once.
+_RESPONSE_RING_SIZE = 8
+
+# Streamed text is flushed to TTS at each sentence boundary
+_SENTENCE_END_RE = re.compile(r"[。！？.!?\n]")
+
+
+def _wait_for_voice_channel(until_idle=True):
+    """
+    Block until the voice channel has finished playing.
+    
+    Polls the channel rather than waiting on pygame's event queue: this runs
+    on the playback worker thread, and SDL events must be pumped on the main
+    thread.
+    
+    Args:
+        until_idle: Wait for all audio to finish if True, otherwise only until
+            the channel's single queue slot is free again
+    """
+    def done():
+        if until_idle:
+            return not VOICE_CHANNEL.get_busy()
+        return VOICE_CHANNEL.get_queue() is None
+    
+    while not done():
+        time.sleep(0.02)
+
+
+def _play_audio_file(audio_path):
+    """Start playing an audio file, queueing it behind the clip that is currently playing."""
+    sound = pygame.mixer.Sound(os.fspath(audio_path))
+    
+    # Only one clip can wait in the channel queue
+    _wait_for_voice_channel(until_idle=False)
+    if VOICE_CHANNEL.get_busy():
+        VOICE_CHANNEL.queue(sound)
+    else:
+        VOICE_CHANNEL.play(sound)
+
+
+def _response_path(index):
+    """Return the ring-buffer file used for the index-th reply clip of the session."""
+    return _DATA_DIR / f"response_{index % _RESPONSE_RING_SIZE}.mp3"
+
+
+def _remove_response_files():
+    """Delete the reply clip files left over from the session."""
+    for i in range(_RESPONSE_RING_SIZE):
+        try:
+            _response_path(i).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _responder_worker(messages, request_queue, response_queue, speech_queue):
+    """
+    Generate AI responses for queued turns and feed their sentences to the speaker.
+    
+    Args:
+        messages: Shared conversation history (user turns are appended by the caller)
+        request_queue: Queue of turn numbers; None stops the worker
+        response_queue: Queue receiving the full response text for display
+        speech_queue: Queue receiving (text, audio_path) items for the speaker
+    """
+    from voice_assistant.ai_service import generate_response_stream, trim_messages
+    
+    clip_index = 0
+    while True:
+        count = request_queue.get()
+        if count is None:
+            speech_queue.put(None)
+            break
+        
+        # Stream the response and start speaking at the first sentence boundary
+        parts = []
+        buffer = ""
+        try:
+            for delta in generate_response_stream(trim_messages(messages)):
+                parts.append(delta)
+                buffer += delta
+                match = _SENTENCE_END_RE.search(buffer)
+                while match:
+                    sentence = buffer[:match.end()].strip()
+                    buffer = buffer[match.end():]
+                    if sentence:
+                        speech_queue.put((sentence, _response_path(clip_index)))
+                        clip_index += 1
+                    match = _SENTENCE_END_RE.search(buffer)
+        except Exception as e:
+            print(f"\n!! 生成回复时出错: {e}")
+        
+        # Speak whatever is left after the last boundary
+        if buffer.strip():
+            speech_queue.put((buffer.strip(), _response_path(clip_index)))
+            clip_index += 1
+        
+        ai_response = "".join(parts) or "抱歉，我现在无法回答。请稍后再试。"
+        
+        # Add assistant response to conversation history
+        messages.append({"role": "assistant", "content": ai_response})
+        response_queue.put(ai_response)
+        speech_queue.put(_TURN_END)
+
+
+def _playback_worker(playback_queue, turn_done):
+    """
+    Play synthesized sentences in order, signalling when each turn has been spoken.
+    
+    Args:
+        playback_queue: Queue of (future, audio_path) items, _TURN_END markers, or None to stop
+        turn_done: Event set once the last sentence of a turn has been played
+    """
+    while True:
+        item = playback_queue.get()
+        if item is None:
+            break
+        if item is _TURN_END:
+            try:
+                _wait_for_voice_channel()
+                print("\n\n✅ 语音回复已播放完毕")
+            except Exception as e:
+                print(f"\n!! 等待语音播放时出错: {e}")
+            finally:
+                # Always release the recorder, even if playback failed
+                turn_done.set()
+            continue
+        
+        future, audio_path = item
+        try:
+            # Blocks only if synthesis of this sentence hasn't finished yet;
+            # a returned path means the file has been written
+            if future.result():
+                print(f"\n>> 正在播放语音回复...")
+                _play_audio_file(audio_path)
+            else:
+                print("\n!! 语音生成失败，跳过这一句")
+        except Exception as e:
+            print(f"\n!! 播放语音时出错: {e}")
+            print(f"\n💾 语音文件已保存至 {audio_path}")
+            print("请手动打开文件收听回复")
+
+
+def _speaker_worker(speech_queue, turn_done):
+    """
+    Synthesize queued sentences ahead of playback and hand them to the playback thread.
+    
+    Args:
+        speech_queue: Queue of (text, audio_path) items, _TURN_END markers, or None to stop
+        turn_done: Event set once the last sentence of a turn has been played
+    """
+    from voice_assistant.text_to_speech import synthesize_speech
+    
+    # At most two sentences are synthesized ahead of the one being played
+    playback_queue = queue.Queue(maxsize=2)
+    player = threading.Thread(target=_playback_worker, args=(playback_queue, turn_done), daemon=True)
+    player.start()
+    
+    def hand_to_player(item):
+        """Queue an item for playback; returns False if the playback thread has died."""
+        while player.is_alive():
+            try:
+                playback_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        print("\n!! 语音播放线程已停止")
+        return False
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        while True:
+            item = speech_queue.get()
+            if item is None or item is _TURN_END:
+                # Ending this thread lets the recorder notice that replies can't be played
+                if not hand_to_player(item) or item is None:
+                    break
+                continue
+            
+            chunk, audio_path = item
+            try:
+                future = executor.submit(synthesize_speech, chunk, audio_path)
+            except Exception as e:
+                print(f"\n!! 语音合成出错，跳过这一句: {e}")
+                continue
+            if not hand_to_player((future, audio_path)):
+                break
+    
+    player.join(timeout=1)
+
+
 def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
     """Run the voice-based assistant with voice input and output."""
+    from voice_assistant.real_speech_to_text import record_and_transcribe
+    _init_audio()
+    
     messages = [{"role": "system", "content": system_prompt}]
     
     count = 0
-    EXIT_PHRASES = {"结束", "退出", "拜拜", "再见", "break out", "bye", "exit", "quit"}
+    
+    # Recorder (this thread) -> responder (LLM) -> speaker (TTS + playback)
+    request_queue = queue.Queue()
+    response_queue = queue.Queue()
+    speech_queue = queue.Queue()
+    turn_done = threading.Event()
+    responder = threading.Thread(
+        target=_responder_worker,
+        args=(messages, request_queue, response_queue, speech_queue),
+        daemon=True
+    )
+    speaker = threading.Thread(target=_speaker_worker, args=(speech_queue, turn_done), daemon=True)
+    responder.start()
+    speaker.start()
     
     print("=" * 50)
     print("语音对话助手 (Voice Conversation Assistant)")
@@ -89,47 +332,29 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
             print(f"\n🗣 您说: {user_text}")
             
             # Check if user wants to exit
-            if any(exit_phrase in user_text.lower() for exit_phrase in EXIT_PHRASES):
+            if EXIT_RE.search(user_text):
                 print("\n🚫 检测到退出指令，结束对话")
                 break
             
             # Add user message to conversation history
             messages.append({"role": "user", "content": user_text})
             
-            # Generate AI response
+            # Hand the turn to the responder
             start_time = time.time()
+            turn_done.clear()
+            request_queue.put(count)
             print("\n🤖 AI正在思考...", end="", flush=True)
             
-            # Start generating response with animation
+            # Show animation while the responder is generating
             animation = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
             i = 0
-            is_generating = True
-            
-            # Define a function to generate response
-            def generate():
-                nonlocal is_generating
-                response = generate_response(messages)
-                is_generating = False
-                return response
-                
-            # Start generating in a separate thread if threading is available
-            try:
-                import threading
-                thread = threading.Thread(target=lambda: globals().update({'ai_response': generate()}))
-                thread.daemon = True
-                thread.start()
-                
-                # Show animation while generating
-                while is_generating and thread.is_alive():
+            while True:
+                try:
+                    ai_response = response_queue.get(timeout=0.1)
+                    break
+                except queue.Empty:
                     print(f"\rAI正在思考... {animation[i % len(animation)]}", end="", flush=True)
-                    time.sleep(0.1)
                     i += 1
-                thread.join()
-                ai_response = globals().get('ai_response', '')
-            except (ImportError, RuntimeError):
-                # Fallback if threading is not available
-                ai_response = generate_response(messages)
-                is_generating = False
             
             # Calculate thinking time
             thinking_time = time.time() - start_time
@@ -137,50 +362,14 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
             
             # Display the response with proper formatting
             print(f"\n>> 助手回复: {ai_response}")
-            
-            # Add assistant response to conversation history
-            messages.append({"role": "assistant", "content": ai_response})
-            
-            # Convert AI response to speech
             print("\n>> 正在生成语音回复...")
-            mp3_filename = f"response_{count}.mp3"
-            
-            # Track TTS start time
-            tts_start = time.time()
-            success = synthesize_speech(ai_response, mp3_filename)
-            tts_time = time.time() - tts_start
-            
-            if success:
-                print(f"\n√√ 语音生成完成 ({tts_time:.1f}秒)")
-            else:
-                print("\n!! 语音生成可能不完整，但将尝试播放可用部分")
             
-            # Play the generated speech directly using pygame
-            try:
-                # Get full path to the audio file
-                audio_path = str(pathlib.Path("data") / mp3_filename)
-                
-                if os.path.exists(audio_path):
-                    print(f"\n>> 正在播放语音回复...")
-                    
-                    # Stop any currently playing audio
-                    pygame.mixer.music.stop()
-                    
-                    # Load and play the audio file
-                    pygame.mixer.music.load(audio_path)
-                    pygame.mixer.music.play()
-                    
-                    # Wait for the audio to finish playing
-                    while pygame.mixer.music.get_busy():
-                        time.sleep(0.1)
-                        
-                    print("\n\n✅ 语音回复已播放完毕")
-                else:
-                    print(f"\n!! 无法找到语音文件: {audio_path}")
-            except Exception as e:
-                print(f"\n!! 播放语音时出错: {e}")
-                print(f"\n💾 语音文件已保存至 data/{mp3_filename}")
-                print("请手动打开文件收听回复")
+            # Don't start recording again until the reply has been spoken,
+            # otherwise the microphone would pick up the assistant's own voice
+            while not turn_done.wait(timeout=0.1):
+                if not speaker.is_alive():
+                    print("\n!! 语音播放线程已停止，本轮回复无法播放")
+                    break
     
     except KeyboardInterrupt:
         print("\n用户终止，退出")
@@ -189,43 +378,111 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
         import traceback
         traceback.print_exc()
     finally:
+        # Stop the pipeline workers
+        request_queue.put(None)
+        responder.join(timeout=1)
+        speaker.join(timeout=1)
+        _remove_response_files()
         print("\n" + "=" * 50)
         print("语音助手已关闭")
         print("=" * 50)
 
 
+class _StdinReader:
+    """Read stdin lines on a daemon thread so the caller can do idle work while waiting."""
+    
+    def __init__(self):
+        self._lines = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            line = sys.stdin.readline()
+            if not line:
+                break
+            self._lines.put(line.rstrip("\r\n"))
+        # Signal end of input
+        self._lines.put(None)
+    
+    def readline(self, idle_tasks=None, poll_interval=0.1):
+        """
+        Wait for the next input line, running one idle task per poll while waiting.
+        
+        Args:
+            idle_tasks: Optional deque of callables to run while the user is typing
+            poll_interval: Seconds to wait for input between idle tasks
+            
+        Returns:
+            str: The input line without its trailing newline
+        """
+        while True:
+            try:
+                line = self._lines.get(timeout=poll_interval)
+            except queue.Empty:
+                if idle_tasks:
+                    try:
+                        idle_tasks.popleft()()
+                    except Exception as e:
+                        print(f"\n后台任务出错: {e}")
+                continue
+            if line is None:
+                raise EOFError
+            return line
+
+
+def _append_conversation_line(fp, role, content):
+    """Append one turn to the JSONL conversation log and flush it to disk."""
+    record = {"t": time.time(), "role": role, "content": content}
+    if ORJSON_AVAILABLE:
+        fp.write(orjson.dumps(record) + b"\n")
+    else:
+        fp.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+    fp.flush()
+
+
 def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conversation=True):
     """Run the text-based assistant with text input and output."""
+    from voice_assistant.ai_service import generate_response, trim_messages
+    
     messages = [{"role": "system", "content": system_prompt}]
-    conversation_log = []
+    conversation_file = None
+    file_path = None
     count = 0
     
+    # Background work (e.g. syncing the log to disk) runs while waiting for input
+    stdin_reader = _StdinReader()
+    idle_tasks = deque()
+    
     print("===== 文本助手已启动，请开始对话 =====")
     print("使用文本输入模式")
     print("输入以下任意词语结束对话: 再见, 退出, 结束, quit, 拜拜, exit, break out, bye\n")
     
-    EXIT_PHRASES = {"结束", "退出", "拜拜", "再见", "break out", "bye", "exit", "quit"}
-    
     try:
         while True:
             count += 1
             print("等待用户输入...")
             
             # Get user input (text only)
-            print("> ", end="")
-            user_text = input()
+            print("> ", end="", flush=True)
+            user_text = stdin_reader.readline(idle_tasks)
             if not user_text:
                 print("未获取到输入，请重试")
                 continue
                 
             print(f"用户: {user_text}")
             
-            # Save to conversation log
+            # Save to conversation log (opened lazily on the first turn)
             if save_conversation:
-                conversation_log.append(f"用户: {user_text}")
+                if conversation_file is None:
+                    from datetime import datetime
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    file_path = _DATA_DIR / f"conversation_{timestamp}.jsonl"
+                    conversation_file = open(file_path, "ab")
+                _append_conversation_line(conversation_file, "user", user_text)
             
             # Check if user wants to exit
-            if any(exit_phrase in user_text.lower() for exit_phrase in exit_phrases):
+            if EXIT_RE.search(user_text):
                 print("检测到退出指令，结束对话")
                 break
             
@@ -234,12 +491,13 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
             
             # Generate AI response
             print("AI正在思考...")
-            ai_response = generate_response(messages)
+            ai_response = generate_response(trim_messages(messages))
             print(f"助手: {ai_response}")
             
-            # Save to conversation log
-            if save_conversation:
-                conversation_log.append(f"助手: {ai_response}")
+            # Save to conversation log and sync it while the user types
+            if conversation_file is not None:
+                _append_conversation_line(conversation_file, "assistant", ai_response)
+                idle_tasks.append(lambda fp=conversation_file: os.fsync(fp.fileno()))
             
             # Add assistant response to conversation history
             messages.append({"role": "assistant", "content": ai_response})
@@ -251,23 +509,24 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
     finally:
         print("语音助手已关闭")
         
-        # Save conversation history if enabled
-        if save_conversation and conversation_log:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"conversation_{timestamp}.txt"
-            
-            # Ensure data directory exists
-            data_dir = pathlib.Path("data")
-            data_dir.mkdir(exist_ok=True)
-            
-            # Save to data directory
-            file_path = data_dir / filename
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write("\n".join(conversation_log))
+        # Conversation history is written per turn; just close the file
+        if conversation_file is not None:
+            conversation_file.close()
             print(f"对话历史已保存至 {file_path}")
 
 
+def _warm_up_connections(voice_mode):
+    """Warm up the LLM (and, in voice mode, TTS) endpoints in the background."""
+    def warm_up():
+        from voice_assistant import ai_service
+        ai_service.warm_up_connection()
+        if voice_mode:
+            from voice_assistant import text_to_speech
+            text_to_speech.warm_up_connection()
+    
+    threading.Thread(target=warm_up, daemon=True).start()
+
+
 def main():
     """Main entry point with mode selection."""
     print("=" * 50)
@@ -284,6 +543,9 @@ def main():
     except (EOFError, KeyboardInterrupt):
         print("\n输入错误，默认选择文本模式")
     
+    # Connect while the user reads the welcome text
+    _warm_up_connections(voice_mode=(choice == "2"))
+    
     try:
         if choice == "1":
             run_text_assistant(system_prompt="你是一个有帮助的助手，请简洁明了地回答问题")
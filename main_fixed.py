@@ -8,9 +8,7 @@ A simplified voice conversation assistant focused on core functionality:
 """
 import os
 import sys
-import io
 import time
-import pathlib
 import pygame
 from dotenv import load_dotenv
 
@@ -18,23 +16,41 @@ from dotenv import load_dotenv
 from voice_assistant.real_speech_to_text import record_and_transcribe
 from voice_assistant.text_to_speech import synthesize_speech
 from voice_assistant.ai_service import generate_response
+from voice_assistant.paths import DATA_DIR
 
 # Load environment variables
 load_dotenv()
 
-# Initialize pygame mixer for audio playback
+# Initialize pygame mixer for audio playback; a fixed format and a larger
+# buffer avoid renegotiation and underrun dropouts under CPU load
+pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=4096)
 pygame.mixer.init()
 
 # Set console encoding
 try:
-    if os.name == 'nt':
-        os.system("chcp 65001 >nul")
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-    sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    # Switch the Windows console code page via the Win32 API (no cmd.exe
+    # subprocess), and only when attached to an interactive console
+    if os.name == 'nt' and sys.stdout.isatty():
+        import ctypes
+        ctypes.windll.kernel32.SetConsoleOutputCP(65001)
+        ctypes.windll.kernel32.SetConsoleCP(65001)
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stdin.reconfigure(encoding='utf-8', errors='replace')
 except Exception as e:
     print(f"Warning: Could not set encoding: {e}")
 
 
+# Number of reply files reused in rotation during a voice session
+RESPONSE_RING_SIZE = 4
+
+
+def _wait_for_music_end():
+    """Block until the current pygame music track has finished playing."""
+    # Poll the mixer like main.py; an end event would need the display module
+    while pygame.mixer.music.get_busy():
+        time.sleep(0.02)
+
+
 def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
     """Run the voice-based assistant with voice input and output."""
     messages = [{"role": "system", "content": system_prompt}]
@@ -110,22 +126,20 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
             
             # Convert AI response to speech
             print("\nGenerating voice response...")
-            mp3_filename = f"response_{count}.mp3"
+            # Rotate through a few file names instead of leaving one file per turn
+            mp3_filename = f"response_{count % RESPONSE_RING_SIZE}.mp3"
             
-            # Generate speech
-            success = synthesize_speech(ai_response, mp3_filename)
+            # Generate speech; returns the written file path, or None on failure
+            audio_path = synthesize_speech(ai_response, mp3_filename)
             
-            if success:
+            if audio_path:
                 print("\nVoice response generated successfully")
             else:
-                print("\nVoice generation may be incomplete, but will try to play available part")
+                print("\nVoice generation failed")
             
             # Play the generated speech directly using pygame
             try:
-                # Get full path to the audio file
-                audio_path = str(pathlib.Path("data") / mp3_filename)
-                
-                if os.path.exists(audio_path):
+                if audio_path:
                     print("\nPlaying voice response...")
                     
                     # Stop any currently playing audio
@@ -136,12 +150,9 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
                     pygame.mixer.music.play()
                     
                     # Wait for the audio to finish playing
-                    while pygame.mixer.music.get_busy():
-                        time.sleep(0.1)
+                    _wait_for_music_end()
                         
                     print("\nVoice playback completed")
-                else:
-                    print(f"\nCould not find audio file: {audio_path}")
             except Exception as e:
                 print(f"\nError playing audio: {e}")
                 print(f"\nAudio file saved to data/{mp3_filename}")
@@ -151,6 +162,13 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
     except Exception as e:
         print(f"Error occurred: {e}")
     finally:
+        # Remove the rotating reply files (unload first so Windows releases the file)
+        try:
+            pygame.mixer.music.unload()
+            for i in range(RESPONSE_RING_SIZE):
+                (DATA_DIR / f"response_{i}.mp3").unlink(missing_ok=True)
+        except (OSError, pygame.error):
+            pass
         print("\n" + "=" * 50)
         print("Voice assistant closed")
         print("=" * 50)
@@ -163,7 +181,8 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
     
     # Set up variables
     count = 0
-    conversation_log = []
+    log_file = None
+    file_path = None
     EXIT_PHRASES = {"结束", "退出", "拜拜", "再见", "break out", "bye", "exit", "quit"}
     
     print("=" * 50)
@@ -195,9 +214,17 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
                 
             print(f"User: {user_text}")
             
-            # Save to conversation log
+            # Save to conversation log (opened on the first turn, line-buffered
+            # so every line reaches the disk immediately)
             if save_conversation:
-                conversation_log.append(f"User: {user_text}")
+                if log_file is None:
+                    from datetime import datetime
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    data_dir = DATA_DIR
+                    data_dir.mkdir(exist_ok=True)
+                    file_path = data_dir / f"conversation_{timestamp}.txt"
+                    log_file = open(file_path, "a", encoding="utf-8", buffering=1)
+                log_file.write(f"User: {user_text}\n")
             
             # Check if user wants to exit
             if any(exit_phrase in user_text.lower() for exit_phrase in EXIT_PHRASES):
@@ -213,8 +240,8 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
             print(f"Assistant: {ai_response}")
             
             # Save to conversation log
-            if save_conversation:
-                conversation_log.append(f"Assistant: {ai_response}")
+            if log_file is not None:
+                log_file.write(f"Assistant: {ai_response}\n")
             
             # Add assistant response to conversation history
             messages.append({"role": "assistant", "content": ai_response})
@@ -226,27 +253,16 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
         print("Text assistant closed")
         print("=" * 50)
         
-        # Save conversation history if enabled
-        if save_conversation and conversation_log:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"conversation_{timestamp}.txt"
-            
-            # Ensure data directory exists
-            data_dir = pathlib.Path("data")
-            data_dir.mkdir(exist_ok=True)
-            
-            # Save to data directory
-            file_path = data_dir / filename
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write("\n".join(conversation_log))
+        # Conversation history is written per turn; just close the file
+        if log_file is not None:
+            log_file.close()
             print(f"Conversation history saved to {file_path}")
 
 
 def main():
     """Main entry point with mode selection."""
     # Create data directory if it doesn't exist
-    data_dir = pathlib.Path("data")
+    data_dir = DATA_DIR
     data_dir.mkdir(exist_ok=True)
     
     print("=" * 50)
@@ -10,17 +10,17 @@ This script provides both text-based and voice-based conversation modes.
 """
 import os
 import sys
-import io
 import time
-import pathlib
 import pygame
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Import voice assistant modules
 from voice_assistant.real_speech_to_text import record_and_transcribe
 from voice_assistant.text_to_speech import synthesize_speech
 from voice_assistant.ai_service import generate_response
+from voice_assistant.paths import DATA_DIR
 
 # Load environment variables
 load_dotenv()
@@ -28,14 +28,19 @@ load_dotenv()
 # Initialize pygame mixer for audio playback
 pygame.mixer.init()
 
+# Single worker used to run LLM requests off the main thread
+llm_executor = ThreadPoolExecutor(max_workers=1)
+
 # 设置控制台编码
 try:
-    # 使用系统命令设置Windows控制台代码页为UTF-8
-    if os.name == 'nt':
-        os.system("chcp 65001 >nul")
+    # 直接调用Win32 API设置控制台代码页为UTF-8（无需启动cmd子进程），仅在交互式控制台下执行
+    if os.name == 'nt' and sys.stdout.isatty():
+        import ctypes
+        ctypes.windll.kernel32.SetConsoleOutputCP(65001)
+        ctypes.windll.kernel32.SetConsoleCP(65001)
     # 设置标准输入输出流编码
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-    sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stdin.reconfigure(encoding='utf-8', errors='replace')
 except Exception as e:
     print(f"警告: 无法设置编码: {e}")
     # 继续运行
@@ -52,7 +57,7 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
     print("语音对话助手 (Voice Conversation Assistant)")
     print("=" * 50)
     print("提示: 系统将提示您开始说话，请在提示后对着麦克风说话")
-    print("      当您说话时，屏幕将显示"正在录音"状态")
+    print("      当您说话时，屏幕将显示“正在录音”状态")
     print("      如果语音识别失败，您可以直接输入文字")
     print("      说'退出'或'exit'结束对话")
     print("=" * 50)
@@ -104,33 +109,16 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
             # Start generating response with animation
             animation = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
             i = 0
-            is_generating = True
             
-            # Define a function to generate response
-            def generate():
-                nonlocal is_generating
-                response = generate_response(messages)
-                is_generating = False
-                return response
-                
-            # Start generating in a separate thread if threading is available
-            try:
-                import threading
-                thread = threading.Thread(target=lambda: globals().update({'ai_response': generate()}))
-                thread.daemon = True
-                thread.start()
-                
-                # Show animation while generating
-                while is_generating and thread.is_alive():
-                    print(f"\rAI正在思考... {animation[i % len(animation)]}", end="", flush=True)
-                    time.sleep(0.1)
-                    i += 1
-                thread.join()
-                ai_response = globals().get('ai_response', '')
-            except (ImportError, RuntimeError):
-                # Fallback if threading is not available
-                ai_response = generate_response(messages)
-                is_generating = False
+            # Generate in a worker thread; the future carries the result (or exception) back
+            future = llm_executor.submit(generate_response, messages)
+            
+            # Show animation while generating
+            while not future.done():
+                print(f"\rAI正在思考... {animation[i % len(animation)]}", end="", flush=True)
+                time.sleep(0.1)
+                i += 1
+            ai_response = future.result()
             
             # Calculate thinking time
             thinking_time = time.time() - start_time
@@ -159,7 +147,7 @@ def run_voice_assistant(system_prompt="你是一个有帮助的助手"):
             # Play the generated speech directly using pygame
             try:
                 # Get full path to the audio file
-                audio_path = str(pathlib.Path("data") / mp3_filename)
+                audio_path = str(DATA_DIR / mp3_filename)
                 
                 if os.path.exists(audio_path):
                     print(f"\n>> 正在播放语音回复...")
@@ -201,7 +189,8 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
     
     # Set up variables
     count = 0
-    conversation_log = []
+    log_file = None
+    file_path = None
     EXIT_PHRASES = {"结束", "退出", "拜拜", "再见", "break out", "bye", "exit", "quit"}
     
     print("=" * 50)
@@ -233,9 +222,17 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
                 
             print(f"用户: {user_text}")
             
-            # Save to conversation log
+            # Save to conversation log (opened on the first turn, line-buffered
+            # so every line reaches the disk immediately)
             if save_conversation:
-                conversation_log.append(f"用户: {user_text}")
+                if log_file is None:
+                    from datetime import datetime
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    data_dir = DATA_DIR
+                    data_dir.mkdir(exist_ok=True)
+                    file_path = data_dir / f"conversation_{timestamp}.txt"
+                    log_file = open(file_path, "a", encoding="utf-8", buffering=1)
+                log_file.write(f"用户: {user_text}\n")
             
             # Check if user wants to exit
             if any(exit_phrase in user_text.lower() for exit_phrase in EXIT_PHRASES):
@@ -251,8 +248,8 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
             print(f"助手: {ai_response}")
             
             # Save to conversation log
-            if save_conversation:
-                conversation_log.append(f"助手: {ai_response}")
+            if log_file is not None:
+                log_file.write(f"助手: {ai_response}\n")
             
             # Add assistant response to conversation history
             messages.append({"role": "assistant", "content": ai_response})
@@ -266,27 +263,16 @@ def run_text_assistant(system_prompt="你是一个有帮助的助手", save_conv
         print("文本助手已关闭")
         print("=" * 50)
         
-        # Save conversation history if enabled
-        if save_conversation and conversation_log:
-            from datetime import datetime
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"conversation_{timestamp}.txt"
-            
-            # Ensure data directory exists
-            data_dir = pathlib.Path("data")
-            data_dir.mkdir(exist_ok=True)
-            
-            # Save to data directory
-            file_path = data_dir / filename
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write("\n".join(conversation_log))
+        # Conversation history is written per turn; just close the file
+        if log_file is not None:
+            log_file.close()
             print(f"对话历史已保存至 {file_path}")
 
 
 def main():
     """Main entry point with mode selection."""
     # Create data directory if it doesn't exist
-    data_dir = pathlib.Path("data")
+    data_dir = DATA_DIR
     data_dir.mkdir(exist_ok=True)
     
     print("=" * 50)
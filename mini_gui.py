@@ -16,6 +16,9 @@ import pathlib
 # 确保数据目录存在
 os.makedirs("data/resources", exist_ok=True)
 
+# 聊天区域最多保留的行数，超出部分从顶部删除
+MAX_CHAT_LINES = 2000
+
 class SimpleVoiceAssistantApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -59,6 +62,12 @@ class SimpleVoiceAssistantApp(tk.Tk):
         self.chat_display.pack(fill=tk.BOTH, expand=True)
         self.chat_display.config(state=tk.DISABLED)
         
+        # 说话者标签样式（只需配置一次）
+        bold_font = (self.default_font[0], self.default_font[1], "bold")
+        self.chat_display.tag_configure("user", foreground="#4a9eff", font=bold_font)
+        self.chat_display.tag_configure("assistant", foreground="#10a37f", font=bold_font)
+        self.chat_display.tag_configure("system", foreground="#ff7043", font=bold_font)
+        
         # 输入区域
         self.input_frame = tk.Frame(self.main_frame, bg="#2b2b2b")
         self.input_frame.pack(fill=tk.X, pady=10)
@@ -107,7 +116,6 @@ class SimpleVoiceAssistantApp(tk.Tk):
     def set_status(self, text):
         """更新状态栏"""
         self.status_bar.config(text=text)
-        self.update_idletasks()
     
     def append_to_chat(self, speaker, message):
         """添加消息到聊天区域"""
@@ -119,21 +127,28 @@ class SimpleVoiceAssistantApp(tk.Tk):
         # 根据说话者格式化消息
         if speaker == "用户":
             self.chat_display.insert(tk.END, f"\n[{timestamp}] 你: ", "user")
-            self.chat_display.tag_configure("user", foreground="#4a9eff", font=(self.default_font[0], self.default_font[1], "bold"))
         elif speaker == "助手":
             self.chat_display.insert(tk.END, f"\n[{timestamp}] 助手: ", "assistant")
-            self.chat_display.tag_configure("assistant", foreground="#10a37f", font=(self.default_font[0], self.default_font[1], "bold"))
         else:
             self.chat_display.insert(tk.END, f"\n[{timestamp}] {speaker}: ", "system")
-            self.chat_display.tag_configure("system", foreground="#ff7043", font=(self.default_font[0], self.default_font[1], "bold"))
         
         # 添加消息内容
         self.chat_display.insert(tk.END, f"{message}\n")
         
+        # 限制聊天区域的总行数，避免长时间会话后重新布局变慢
+        lines = int(self.chat_display.index("end-1c").split(".")[0])
+        if lines > MAX_CHAT_LINES:
+            self.chat_display.delete("1.0", f"{lines - MAX_CHAT_LINES}.0")
+        
         # 滚动到底部
         self.chat_display.see(tk.END)
         self.chat_display.config(state=tk.DISABLED)
     
+    def _finish_response(self, response):
+        """显示助手回复并恢复状态栏"""
+        self.append_to_chat("助手", response)
+        self.set_status("就绪")
+    
     def on_send(self, event=None):
         """处理发送消息"""
         user_text = self.text_input.get("1.0", tk.END).strip()
@@ -166,9 +181,8 @@ class SimpleVoiceAssistantApp(tk.Tk):
                 # 默认回复
                 response = "我收到了您的消息，但在这个简化版本中，我只能提供基本回复。请使用完整版获取更好的体验。"
             
-            # 显示助手回复
-            self.after(0, lambda: self.append_to_chat("助手", response))
-            self.after(0, lambda: self.set_status("就绪"))
+            # 显示助手回复（回复和状态在同一个回调中更新）
+            self.after(0, self._finish_response, response)
         
         # 在后台线程中处理
         response_thread = threading.Thread(target=respond)
@@ -9,20 +9,32 @@ A modern GUI for the voice conversation assistant with international design:
 Features a clean, modern interface with improved user experience.
 """
 import os
+import re
 import sys
 import io
+import json
+import hashlib
 import time
+import queue
 import pathlib
 import threading
 import datetime
+from collections import OrderedDict
 from PIL import Image, ImageTk
 import customtkinter as ctk
 from dotenv import load_dotenv
 
+# pygame is optional; without it replies are opened in the system's default player
+try:
+    import pygame
+    PYGAME_AVAILABLE = True
+except ImportError:
+    PYGAME_AVAILABLE = False
+
 # Import voice assistant modules
 from voice_assistant.windows_speech import windows_record_and_transcribe
-from voice_assistant.text_to_speech import synthesize_speech
-from voice_assistant.ai_service import generate_response
+from voice_assistant.text_to_speech import synthesize_speech_cached
+from voice_assistant.ai_service import generate_response_stream, trim_messages, FALLBACK_RESPONSE
 
 # Load environment variables
 load_dotenv()
@@ -35,122 +47,315 @@ except Exception as e:
     print(f"Warning: Could not set encoding: {e}")
 
 # Define exit phrases - include both Chinese and English for international users
-EXIT_PHRASES = {"结束", "退出", "拜拜", "再见", "break out", "bye", "exit", "quit", "stop", "end"}
+EXIT_PHRASES = frozenset({"结束", "退出", "拜拜", "再见", "break out", "bye", "exit", "quit", "stop", "end"})
+
+# Single English words are matched against the input's word set
+_EXIT_WORDS = frozenset(phrase for phrase in EXIT_PHRASES if phrase.isascii() and " " not in phrase)
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Chinese phrases (not space-separated) and multi-word phrases fall back to one small regex
+_EXIT_RE = re.compile("|".join(
+    rf"(?<![a-z]){re.escape(phrase)}(?![a-z])" if phrase.isascii() else re.escape(phrase)
+    for phrase in sorted(EXIT_PHRASES - _EXIT_WORDS, key=len, reverse=True)
+))
+
+
+def is_exit_request(text):
+    """Return True if the text asks to end the conversation"""
+    text = text.lower()
+    return not _EXIT_WORDS.isdisjoint(_WORD_RE.findall(text)) or _EXIT_RE.search(text) is not None
+
+
+# Recent AI answers keyed by a hash of the conversation that produced them
+_RESPONSE_CACHE = OrderedDict()
+_RESPONSE_CACHE_SIZE = 64
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+
+def _conversation_key(messages):
+    """Hash a conversation into a compact response-cache key"""
+    payload = json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def stream_cached_response(messages):
+    """Yield the AI answer for a conversation as it streams in
+    
+    An answer generated before for the same conversation is yielded in one piece
+    without contacting the model.
+    
+    Args:
+        messages: Conversation history in OpenAI message format
+        
+    Yields:
+        str: Successive pieces of the AI response text
+    """
+    key = _conversation_key(messages)
+    with _RESPONSE_CACHE_LOCK:
+        if key in _RESPONSE_CACHE:
+            _RESPONSE_CACHE.move_to_end(key)
+            cached = _RESPONSE_CACHE[key]
+        else:
+            cached = None
+    if cached is not None:
+        yield cached
+        return
+        
+    parts = []
+    stream = generate_response_stream(messages)
+    while True:
+        try:
+            chunk = next(stream)
+        except StopIteration as stop:
+            complete = stop.value
+            break
+        parts.append(chunk)
+        yield chunk
+        
+    # Don't remember failures or replies cut off mid-stream
+    response = "".join(parts)
+    if not complete or response == FALLBACK_RESPONSE:
+        return
+        
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE[key] = response
+        if len(_RESPONSE_CACHE) > _RESPONSE_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+
+
+# Streamed text is handed to TTS at each sentence boundary
+_SENTENCE_END_RE = re.compile(r"[。！？.!?\n]")
+
+# Marks the end of a streamed response in the chunk queue
+_STREAM_END = object()
 
 # Set appearance mode and default color theme
 ctk.set_appearance_mode("system")  # Use system setting by default
 ctk.set_default_color_theme("blue")  # Default theme
 
-class ScrollableMessageFrame(ctk.CTkScrollableFrame):
-    """A scrollable frame that displays conversation messages in a modern chat style"""
+# Chat message tag colors as (light mode, dark mode) pairs
+MESSAGE_TAG_COLORS = {
+    "user": {"background": ("#2563EB", "#2563EB"), "foreground": ("#FFFFFF", "#FFFFFF")},
+    "assistant": {"background": ("#F3F4F6", "#1F2937"), "foreground": ("#000000", "#FFFFFF")},
+    "thinking": {"foreground": ("#6B7280", "#9CA3AF")},
+}
+
+# Tag options resolved once per appearance mode (0 = light, 1 = dark)
+_TAG_OPTIONS_BY_MODE = [
+    {tag: {option: colors[mode] for option, colors in options.items()}
+     for tag, options in MESSAGE_TAG_COLORS.items()}
+    for mode in (0, 1)
+]
+
+
+# Default AI avatar, generated by create_default_resources on first start
+AVATAR_PATH = pathlib.Path("data/resources/ai_avatar.png")
+
+# Solid-color button icons, shared by color across buttons and app instances
+_SOLID_IMAGES = {}
+
+
+def _solid_image(color, size=(20, 20)):
+    """Return a shared solid-color PIL image"""
+    key = (color, size)
+    image = _SOLID_IMAGES.get(key)
+    if image is None:
+        image = _SOLID_IMAGES[key] = Image.new("RGB", size, color=color)
+    return image
+
+
+class ScrollableMessageFrame(ctk.CTkFrame):
+    """A scrollable chat view that renders every message as a tagged range of a single textbox"""
+    
+    # Messages added within this window are rendered together
+    FLUSH_DELAY_MS = 50
     
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, avatar=None, **kwargs):
         super().__init__(master, **kwargs)
+        self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
         
-        # Store message widgets references
-        self.message_widgets = []
+        # One textbox holds the whole conversation, so the widget count stays constant
+        self.text = ctk.CTkTextbox(
+            self,
+            fg_color="transparent",
+            border_width=0,
+            wrap="word"
+        )
+        self.text.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+        
+        # Bubble layout: user messages on the right, assistant messages on the left
+        self.text.tag_config("user", justify="right", lmargin1=150, lmargin2=150, rmargin=10,
+                             spacing1=10, spacing3=5)
+        self.text.tag_config("assistant", justify="left", lmargin1=10, lmargin2=50, rmargin=150,
+                             spacing1=10, spacing3=5)
+        self.update_colors()
+        self.text.configure(state="disabled")
+        
+        # (start mark, end mark, is_user) for each message, in display order
+        self.message_ranges = []
+        self._mark_counter = 0
+        
+        # Messages waiting for the next flush, so bursts share one insert and scroll
+        self._pending = []
+        self._flush_scheduled = False
+        self._scroll_scheduled = False
+        
+        # Pre-loaded AI avatar image shared by every assistant message (or None)
+        self.avatar = avatar
+        
+    def update_colors(self, dark=None):
+        """Apply the tag colors for the given (or current) appearance mode"""
+        if dark is None:
+            dark = ctk.get_appearance_mode() == "Dark"
+        for tag, options in _TAG_OPTIONS_BY_MODE[1 if dark else 0].items():
+            self.text.tag_config(tag, **options)
+            
+    def _set_appearance_mode(self, mode_string):
+        """Recolor message tags whenever customtkinter switches appearance mode"""
+        super()._set_appearance_mode(mode_string)
+        self.update_colors(dark=mode_string.lower() == "dark")
+        
+    def _insert_avatar(self):
+        """Embed the AI avatar at the end of the textbox"""
+        if self.avatar is not None:
+            # CTkTextbox does not wrap image_create; embed through the underlying tk.Text
+            textbox = self.text._textbox
+            index = textbox.index("end-1c")
+            textbox.image_create(index, image=self.avatar, padx=5)
+            # Tag the image too, so it takes the assistant line's alignment and spacing
+            textbox.tag_add("assistant", index)
+            self.text.insert("end", " ", ("assistant",))
+        
+    @staticmethod
+    def _text_mark(start_mark):
+        """Return the name of the mark placed where a message's text starts"""
+        return start_mark.replace("_start", "_text")
         
     def add_message(self, is_user, message, thinking=False):
-        """Add a message to the chat in a bubble style"""
-        # Create frame for this message
+        """Queue a message for the chat; it is rendered on the next flush"""
         if is_user:
-            # User message (right-aligned)
-            message_frame = ctk.CTkFrame(self, fg_color="transparent")
-            message_frame.grid(row=len(self.message_widgets), column=0, pady=(10, 5), padx=10, sticky="e")
-            
-            # Message bubble with user color
-            bubble = ctk.CTkTextbox(
-                message_frame, 
-                width=400, 
-                height=None,  # Auto height
-                fg_color="#2563EB",  # Modern blue for user messages
-                text_color="#FFFFFF",
-                border_width=0,
-                corner_radius=15,
-                wrap="word",
-                activate_scrollbars=False
-            )
-            bubble.grid(row=0, column=0, padx=10, pady=5)
-            
+            tags = ("user",)
+        elif thinking:
+            tags = ("assistant", "thinking")
         else:
-            # Assistant message (left-aligned)
-            message_frame = ctk.CTkFrame(self, fg_color="transparent")
-            message_frame.grid(row=len(self.message_widgets), column=0, pady=(10, 5), padx=10, sticky="w")
+            tags = ("assistant",)
             
-            # Icon (optional, can add AI avatar here)
-            icon_size = 35
-            try:
-                # Try to load an avatar image
-                avatar_path = pathlib.Path("data/resources/ai_avatar.png")
-                if avatar_path.exists():
-                    img = Image.open(avatar_path).resize((icon_size, icon_size))
-                    photo = ImageTk.PhotoImage(img)
-                    icon_label = ctk.CTkLabel(message_frame, image=photo, text="")
-                    icon_label.image = photo  # Keep a reference
-                    icon_label.grid(row=0, column=0, padx=(0, 5))
-                else:
-                    # Create a simple colored circle as avatar
-                    icon_label = ctk.CTkLabel(
-                        message_frame, 
-                        text="AI",
-                        width=icon_size,
-                        height=icon_size,
-                        corner_radius=icon_size // 2,
-                        fg_color="#10B981",  # Modern green for AI
-                        text_color="#FFFFFF",
-                        font=ctk.CTkFont(family="Arial", size=12, weight="bold")
-                    )
-                    icon_label.grid(row=0, column=0, padx=(0, 5))
-            except:
-                # Skip avatar if there's any issue
-                pass
+        start_mark = f"msg{self._mark_counter}_start"
+        end_mark = f"msg{self._mark_counter}_end"
+        self._mark_counter += 1
+        
+        # Register the range now so callers can index it before it is drawn
+        self.message_ranges.append((start_mark, end_mark, is_user))
+        self._pending.append((start_mark, end_mark, is_user, message, tags))
+        
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.after(self.FLUSH_DELAY_MS, self._flush)
+            
+    def _flush(self):
+        """Render all pending messages with a single insert pass and scroll"""
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+            
+        pending, self._pending = self._pending, []
+        self.text.configure(state="normal")
+        try:
+            for start_mark, end_mark, is_user, message, tags in pending:
+                # Marks keep left gravity so later inserts at the end don't move them
+                self.text.mark_set(start_mark, "end-1c")
+                self.text.mark_gravity(start_mark, "left")
+                if not is_user:
+                    self._insert_avatar()
+                # Where the message text begins, after any avatar
+                text_mark = self._text_mark(start_mark)
+                self.text.mark_set(text_mark, "end-1c")
+                self.text.mark_gravity(text_mark, "left")
+                self.text.insert("end", message + "\n", tags)
+                self.text.mark_set(end_mark, "end-1c")
+                self.text.mark_gravity(end_mark, "left")
+        finally:
+            # A failed insert must not leave the view editable or retry the same batch forever
+            self.text.configure(state="disabled")  # Make read-only
+        
+        # Scroll once to see the new messages
+        self._scroll_to_bottom()
+        
+    def replace_message_text(self, index, text):
+        """Rewrite the message at the given position in place as a regular message"""
+        start_mark, end_mark, is_user = self.message_ranges[index]
+        tags = ("user",) if is_user else ("assistant",)
+        
+        # Not drawn yet: just swap what will be drawn
+        for i, pending in enumerate(self._pending):
+            if pending[0] == start_mark:
+                self._pending[i] = (start_mark, end_mark, is_user, text, tags)
+                return
                 
-            # Message bubble with assistant color
-            bubble = ctk.CTkTextbox(
-                message_frame, 
-                width=400, 
-                height=None,  # Auto height
-                fg_color="#1F2937" if ctk.get_appearance_mode() == "Dark" else "#F3F4F6",  # Adaptive color based on theme
-                text_color="#FFFFFF" if ctk.get_appearance_mode() == "Dark" else "#000000",
-                border_width=0,
-                corner_radius=15,
-                wrap="word",
-                activate_scrollbars=False
-            )
-            bubble.grid(row=0, column=1, padx=5, pady=5)
-            
-        # Insert message text
-        bubble.insert("0.0", message)
-        bubble.configure(state="disabled")  # Make read-only
-        
-        # Adjust height based on content
-        line_count = message.count('\n') + 1
-        char_count = len(message)
-        height = max(35, min(300, 20 * line_count + char_count // 60 * 5))
-        bubble.configure(height=height)
-        
-        # Store reference to widgets for future management
-        self.message_widgets.append((message_frame, is_user))
-        
-        # Scroll to see the new message
+        # Keep the avatar and trailing newline; replace only the text between them
+        text_start = self._text_mark(start_mark)
+        self.text.configure(state="normal")
+        self.text.delete(text_start, f"{end_mark}-1c")
+        self.text.insert(f"{end_mark}-1c", text, tags)
+        self.text.tag_remove("thinking", start_mark, end_mark)
+        self.text.configure(state="disabled")
+        
+        self._scroll_to_bottom()
+        
+    def append_to_message(self, index, text):
+        """Append text to the end of the message at the given position"""
+        start_mark, end_mark, _ = self.message_ranges[index]
+        if any(pending[0] == start_mark for pending in self._pending):
+            self._flush()
+            
+        # Insert before the message's trailing newline, with the message's own tags
+        insert_at = f"{end_mark}-1c"
+        self.text.configure(state="normal")
+        self.text.insert(insert_at, text, self.text.tag_names(insert_at))
+        self.text.configure(state="disabled")
+        
         self._scroll_to_bottom()
         
     def _scroll_to_bottom(self):
-        """Scroll to the bottom of the messages"""
-        self.update_idletasks()
-        self._parent_canvas.yview_moveto(1.0)
+        """Scroll to the bottom of the messages once Tk is idle"""
+        if not self._scroll_scheduled:
+            self._scroll_scheduled = True
+            self.after_idle(self._do_scroll_to_bottom)
+            
+    def _do_scroll_to_bottom(self):
+        """Scroll the textbox after the pending layout has settled"""
+        self._scroll_scheduled = False
+        self.text.see("end")
         
     def clear_messages(self):
         """Clear all messages"""
-        for frame, _ in self.message_widgets:
-            frame.destroy()
-        self.message_widgets = []
+        self._pending = []
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.configure(state="disabled")
+        
+        # Drop every message mark in one Tk call (CTkTextbox.mark_unset takes a single mark,
+        # so go through the underlying tk.Text); the widget itself is kept and reused
+        marks = [
+            mark
+            for start_mark, end_mark, _ in self.message_ranges
+            for mark in (start_mark, self._text_mark(start_mark), end_mark)
+        ]
+        if marks:
+            self.text._textbox.mark_unset(*marks)
+        self.message_ranges = []
 
 
 class ModernVoiceAssistantApp(ctk.CTk):
     """Modern UI for Voice Assistant with international design"""
     
+    # How often streamed response text is moved into the chat
+    CHUNK_POLL_MS = 30
+    
+    # User turns (with their replies) kept in the history sent to the AI
+    MAX_HISTORY_TURNS = 10
+    
     def __init__(self):
         super().__init__()
         
@@ -159,18 +364,38 @@ class ModernVoiceAssistantApp(ctk.CTk):
         self.geometry("1000x700")
         self.minsize(800, 600)
         
-        # Create resources and data directories if they don't exist
-        resources_dir = pathlib.Path("data/resources")
-        resources_dir.mkdir(exist_ok=True, parents=True)
+        # Load the AI avatar once; every assistant message reuses it
+        self._avatar_img = None
+        if AVATAR_PATH.exists():
+            try:
+                self._avatar_img = ImageTk.PhotoImage(Image.open(AVATAR_PATH).resize((35, 35)))
+            except Exception as e:
+                print(f"Could not load AI avatar: {e}")
+        
+        # Keep one mixer channel open for spoken replies instead of launching a player per reply
+        self._audio_channel = None
+        if PYGAME_AVAILABLE:
+            try:
+                pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=4096)
+                pygame.mixer.init()
+                pygame.mixer.set_reserved(1)
+                self._audio_channel = pygame.mixer.Channel(0)
+            except pygame.error as e:
+                print(f"Could not initialize audio playback: {e}")
         
         # Initialize state variables
         self.is_recording = False
         self.is_processing = False
         self.conversation_count = 0
         self.thinking_message_index = None
+        self.response_message_index = None
+        self._chunk_queue = queue.Queue()
+        
+        # One long-lived worker per pipeline stage (speech recognition, AI, speech output)
+        self._stt_queue = self._start_worker("stt-worker")
+        self._llm_queue = self._start_worker("llm-worker")
+        self._tts_queue = self._start_worker("tts-worker")
         self.text_height = 1  # Initial text input height
-        self.record_anim_index = 0
-        self.record_anim_running = False
         
         # Initialize conversation history
         self.messages = [{"role": "system", "content": "You are a helpful assistant providing clear and concise answers."}]
@@ -181,6 +406,29 @@ class ModernVoiceAssistantApp(ctk.CTk):
         # Add welcome message
         self.message_frame.add_message(False, "Hello! I'm your voice assistant. How can I help you today?")
         
+    @staticmethod
+    def _start_worker(name):
+        """Start a daemon thread that runs the callables put on its queue, in order
+        
+        Args:
+            name: Name of the worker thread
+            
+        Returns:
+            queue.Queue: The queue feeding the worker
+        """
+        tasks = queue.Queue()
+        
+        def run():
+            while True:
+                task = tasks.get()
+                try:
+                    task()
+                except Exception as e:
+                    print(f"{name} task failed: {e}")
+                    
+        threading.Thread(target=run, name=name, daemon=True).start()
+        return tasks
+        
     def _setup_ui(self):
         """Set up the user interface components in modern style"""
         # Configure grid layout
@@ -208,8 +456,8 @@ class ModernVoiceAssistantApp(ctk.CTk):
         
         # Theme toggle button
         self.theme_icon = ctk.CTkImage(
-            light_image=Image.new("RGB", (20, 20), color=(30, 30, 30)),
-            dark_image=Image.new("RGB", (20, 20), color=(240, 240, 240)),
+            light_image=_solid_image((30, 30, 30)),
+            dark_image=_solid_image((240, 240, 240)),
             size=(20, 20)
         )
         
@@ -249,6 +497,7 @@ class ModernVoiceAssistantApp(ctk.CTk):
         # Chat display - scrollable frame for messages
         self.message_frame = ScrollableMessageFrame(
             content_frame,
+            avatar=self._avatar_img,
             width=750,
             corner_radius=10,
             fg_color=("#F9FAFB", "#111827")  # Light mode, Dark mode
@@ -274,13 +523,20 @@ class ModernVoiceAssistantApp(ctk.CTk):
         )
         self.input_textbox.grid(row=0, column=0, sticky="ew", padx=(0, 10))
         
-        # Placeholder text
-        self.input_textbox.insert("0.0", "Type a message...")
-        self.input_placeholder = True
+        # Placeholder label drawn over the empty textbox; the textbox content is never touched
+        self.input_placeholder = ctk.CTkLabel(
+            input_frame,
+            text="Type a message...",
+            fg_color=("#FFFFFF", "#1F2937"),
+            text_color=("#9CA3AF", "#6B7280"),
+            font=ctk.CTkFont(family="Arial", size=14)
+        )
+        self.input_placeholder.bind("<Button-1>", lambda event: self.input_textbox.focus_set())
+        self.placeholder_visible = False
+        self._update_placeholder()
         
         # Bind events for input text
-        self.input_textbox.bind("<FocusIn>", self._on_entry_click)
-        self.input_textbox.bind("<FocusOut>", self._on_focus_out)
+        self.input_textbox.bind("<KeyRelease>", self._update_placeholder)
         self.input_textbox.bind("<Return>", self._on_text_submit)
         self.input_textbox.bind("<Shift-Return>", self._on_shift_return)
         
@@ -290,8 +546,7 @@ class ModernVoiceAssistantApp(ctk.CTk):
         
         # Voice button
         self.voice_icon = ctk.CTkImage(
-            light_image=Image.new("RGB", (20, 20), color=(52, 211, 153)),
-            dark_image=Image.new("RGB", (20, 20), color=(52, 211, 153)),
+            light_image=_solid_image((52, 211, 153)),  # Same image in both modes
             size=(20, 20)
         )
         self.voice_button = ctk.CTkButton(
@@ -309,8 +564,7 @@ class ModernVoiceAssistantApp(ctk.CTk):
         
         # Send button
         self.send_icon = ctk.CTkImage(
-            light_image=Image.new("RGB", (20, 20), color=(255, 255, 255)),
-            dark_image=Image.new("RGB", (20, 20), color=(255, 255, 255)),
+            light_image=_solid_image((255, 255, 255)),  # Same image in both modes
             size=(20, 20)
         )
         self.send_button = ctk.CTkButton(
@@ -351,17 +605,17 @@ class ModernVoiceAssistantApp(ctk.CTk):
         self.progress_bar.grid(row=0, column=1, sticky="e", padx=10)
         self.progress_bar.set(0)  # Initialize as empty
         
-    def _on_entry_click(self, event):
-        """Handle text area focus in - clear placeholder"""
-        if self.input_placeholder:
-            self.input_textbox.delete("0.0", "end")
-            self.input_placeholder = False
+    def _update_placeholder(self, event=None):
+        """Show the placeholder only while the text area is empty"""
+        is_empty = not self.input_textbox.get("0.0", "end-1c")
+        if is_empty == self.placeholder_visible:
+            return
             
-    def _on_focus_out(self, event):
-        """Handle text area focus out - restore placeholder if empty"""
-        if not self.input_textbox.get("0.0", "end-1c"):
-            self.input_textbox.insert("0.0", "Type a message...")
-            self.input_placeholder = True
+        if is_empty:
+            self.input_placeholder.place(in_=self.input_textbox, x=12, y=8)
+        else:
+            self.input_placeholder.place_forget()
+        self.placeholder_visible = is_empty
             
     def _on_shift_return(self, event):
         """Allow multi-line input with Shift+Enter"""
@@ -375,13 +629,13 @@ class ModernVoiceAssistantApp(ctk.CTk):
         # Get input text
         user_text = self.input_textbox.get("0.0", "end-1c").strip()
         
-        # Check if placeholder or empty
-        if not user_text or self.input_placeholder:
+        # Check if empty
+        if not user_text:
             return "break"
             
         # Clear input field
         self.input_textbox.delete("0.0", "end")
-        self.input_placeholder = False
+        self._update_placeholder()
         
         # Process the user input
         self._process_user_input(user_text)
@@ -396,87 +650,63 @@ class ModernVoiceAssistantApp(ctk.CTk):
         if self.is_recording:
             # Stop recording
             self.is_recording = False
-            self.voice_button.configure(fg_color="#10B981")
-            self.voice_button.configure(text="")
+            self.voice_button.configure(fg_color="#10B981", text="")
             
-            # Stop animation if it's running
-            if self.record_anim_running:
-                self.record_anim_running = False
+            # Stop the recording indicator
+            self.progress_bar.stop()
+            self.progress_bar.set(0)
                 
             # Set status back to ready
             self.set_status("Ready")
         else:
             # Start recording
             self.is_recording = True
-            self.voice_button.configure(fg_color="#DC2626")  # Red for recording
+            self.voice_button.configure(fg_color="#DC2626", text="◉")  # Red for recording
             
             # Show recording status
             self.set_status("Listening...")
             
-            # Start recording animation
-            self.record_anim_running = True
-            self._update_recording_animation()
+            # The progress bar animates while recording; the button itself stays static
+            self.progress_bar.start()
             
-            # Start recording in a separate thread
-            record_thread = threading.Thread(target=self._record_audio)
-            record_thread.daemon = True
-            record_thread.start()
+            # Record on the speech recognition worker
+            self._stt_queue.put(self._record_audio)
             
-    def _update_recording_animation(self):
-        """Update the recording button animation"""
-        if not self.record_anim_running:
-            return
-            
-        # Animation frames
-        frames = ["◉", "◎", "◌", "◎"]
-        
-        # Update button text with animation frame
-        self.voice_button.configure(text=frames[self.record_anim_index])
-        self.record_anim_index = (self.record_anim_index + 1) % len(frames)
-        
-        # Schedule next frame update
-        self.after(300, self._update_recording_animation)
-        
     def _record_audio(self):
-        """Record audio and transcribe it"""
+        """Record audio and transcribe it (runs on the speech recognition worker)"""
         try:
-            # Set status
-            self.after(0, lambda: self.set_status("Listening..."))
-            
             # Record and transcribe audio using Windows-optimized module
             user_text = windows_record_and_transcribe(duration=5, language="zh-CN")
             
-            # Update status
-            self.after(0, lambda: self.set_status("Processing..."))
-            
-            # Reset recording state
-            self.after(0, lambda: self._set_recording_state(False))
-            
-            # Process the recognized text
-            if user_text:
-                self.after(0, lambda: self._process_user_input(user_text))
-            else:
-                self.after(0, lambda: self.set_status("Speech not recognized. Please try again."))
+            # Hand the result to the Tk thread in a single callback
+            self.after(0, lambda: self._on_transcription(user_text))
                 
         except Exception as e:
             error_msg = f"Speech recognition error: {e}"
-            self.after(0, lambda: self.set_status(error_msg))
+            self.after(0, lambda: self._on_transcription(None, error_msg))
             
-            # Reset recording state
-            self.after(0, lambda: self._set_recording_state(False))
+    def _on_transcription(self, user_text, error_msg=None):
+        """Reset the recording state and process the recognized text"""
+        self._set_recording_state(False)
+        
+        if error_msg:
+            self.set_status(error_msg)
+        elif user_text:
+            self._process_user_input(user_text)
+        else:
+            self.set_status("Speech not recognized. Please try again.")
             
     def _set_recording_state(self, is_recording):
         """Set recording state and update UI accordingly"""
         self.is_recording = is_recording
         
         if is_recording:
-            self.voice_button.configure(fg_color="#DC2626")  # Red for recording
-            self.record_anim_running = True
-            self._update_recording_animation()
+            self.voice_button.configure(fg_color="#DC2626", text="◉")  # Red for recording
+            self.progress_bar.start()
         else:
-            self.voice_button.configure(fg_color="#10B981")  # Green when not recording
-            self.voice_button.configure(text="")
-            self.record_anim_running = False
+            self.voice_button.configure(fg_color="#10B981", text="")  # Green when not recording
+            self.progress_bar.stop()
+            self.progress_bar.set(0)
             
     def _process_user_input(self, user_text):
         """Process user input text and generate response"""
@@ -484,7 +714,7 @@ class ModernVoiceAssistantApp(ctk.CTk):
             return
             
         # Check if user wants to exit
-        if any(exit_phrase in user_text.lower() for exit_phrase in EXIT_PHRASES):
+        if is_exit_request(user_text):
             self.message_frame.add_message(True, user_text)
             self.message_frame.add_message(False, "Goodbye! The application will now close.")
             self.after(2000, self.destroy)
@@ -498,6 +728,7 @@ class ModernVoiceAssistantApp(ctk.CTk):
         
         # Add to conversation history
         self.messages.append({"role": "user", "content": user_text})
+        self._trim_history()
         
         # Show thinking indicator
         self._add_thinking_indicator()
@@ -507,10 +738,11 @@ class ModernVoiceAssistantApp(ctk.CTk):
         self.set_status("AI is thinking...")
         self.progress_bar.start()
         
-        # Generate AI response in a separate thread
-        response_thread = threading.Thread(target=self._generate_ai_response)
-        response_thread.daemon = True
-        response_thread.start()
+        # Generate AI response on the AI worker
+        self._llm_queue.put(self._generate_ai_response)
+        
+        # Show the response as it streams in
+        self.after(self.CHUNK_POLL_MS, self._drain_chunks)
         
     def _add_thinking_indicator(self):
         """Add a thinking indicator message that will be replaced by actual response"""
@@ -518,97 +750,165 @@ class ModernVoiceAssistantApp(ctk.CTk):
         self.message_frame.add_message(False, "Thinking...", thinking=True)
         
         # Store the index of the thinking message (for replacing later)
-        self.thinking_message_index = len(self.message_frame.message_widgets) - 1
+        self.thinking_message_index = len(self.message_frame.message_ranges) - 1
         
     def _generate_ai_response(self):
-        """Generate AI response in a separate thread"""
+        """Stream the AI response in a separate thread, speaking it sentence by sentence"""
+        speech_queue = queue.Queue()
+        self._tts_queue.put(lambda: self._generate_speech(speech_queue))
+        
+        parts = []
+        pending_text = ""
         try:
-            # Generate response
-            ai_response = generate_response(self.messages)
-            
-            # Handle response on main thread
-            self.after(0, lambda: self._handle_ai_response(ai_response))
+            for chunk in stream_cached_response(list(self.messages)):
+                parts.append(chunk)
+                self._chunk_queue.put(chunk)
+                
+                # Start speaking each sentence as soon as it is complete
+                pending_text += chunk
+                match = _SENTENCE_END_RE.search(pending_text)
+                while match:
+                    sentence = pending_text[:match.end()]
+                    pending_text = pending_text[match.end():]
+                    if sentence.strip():
+                        speech_queue.put(sentence)
+                    match = _SENTENCE_END_RE.search(pending_text)
+            if pending_text.strip():
+                speech_queue.put(pending_text)
+                
+            self._chunk_queue.put((_STREAM_END, "".join(parts), None))
             
         except Exception as e:
-            error_msg = f"Error generating response: {e}"
-            self.after(0, lambda: self.set_status(error_msg))
+            self._chunk_queue.put((_STREAM_END, None, f"Error generating response: {e}"))
+        finally:
+            speech_queue.put(None)
             
-            # Remove thinking indicator and show error
-            if self.thinking_message_index is not None:
-                thinking_frame, _ = self.message_frame.message_widgets[self.thinking_message_index]
-                thinking_frame.destroy()
-                self.message_frame.message_widgets.pop(self.thinking_message_index)
-                self.thinking_message_index = None
+    def _drain_chunks(self):
+        """Show newly streamed text in the chat (runs on the Tk thread)"""
+        while True:
+            try:
+                item = self._chunk_queue.get_nowait()
+            except queue.Empty:
+                break
                 
-                # Add error message
-                self.message_frame.add_message(False, f"Error: {error_msg}")
-            
-            # Reset processing state
-            self.is_processing = False
-            self.progress_bar.stop()
-            self.after(0, lambda: self.set_status("Ready"))
+            if isinstance(item, tuple) and item[0] is _STREAM_END:
+                _, ai_response, error_msg = item
+                if error_msg is not None:
+                    self.set_status(error_msg)
+                    self._show_response_error(error_msg)
+                else:
+                    self._handle_ai_response(ai_response)
+                self.response_message_index = None
+                return
+                
+            if self.response_message_index is None:
+                # The first text takes over the thinking indicator in place
+                if self.thinking_message_index is not None:
+                    self.message_frame.replace_message_text(self.thinking_message_index, item)
+                    self.response_message_index = self.thinking_message_index
+                    self.thinking_message_index = None
+                else:
+                    self.message_frame.add_message(False, item)
+                    self.response_message_index = len(self.message_frame.message_ranges) - 1
+            else:
+                self.message_frame.append_to_message(self.response_message_index, item)
+                
+        self.after(self.CHUNK_POLL_MS, self._drain_chunks)
+        
+    def _show_response_error(self, error_msg):
+        """Replace the thinking indicator with an error message"""
+        if self.thinking_message_index is not None:
+            self.message_frame.replace_message_text(self.thinking_message_index, f"Error: {error_msg}")
+            self.thinking_message_index = None
+        else:
+            self.message_frame.add_message(False, f"Error: {error_msg}")
             
     def _handle_ai_response(self, ai_response):
-        """Handle the generated AI response"""
-        # Remove thinking indicator
+        """Handle the complete AI response once streaming has finished"""
+        # An empty stream never replaced the thinking indicator
         if self.thinking_message_index is not None:
-            thinking_frame, _ = self.message_frame.message_widgets[self.thinking_message_index]
-            thinking_frame.destroy()
-            self.message_frame.message_widgets.pop(self.thinking_message_index)
+            self.message_frame.replace_message_text(self.thinking_message_index, ai_response)
             self.thinking_message_index = None
             
-        # Add AI response to the chat
-        self.message_frame.add_message(False, ai_response)
-        
         # Add to conversation history
         self.messages.append({"role": "assistant", "content": ai_response})
+        self._trim_history()
         
         # Update status
-        self.set_status("Generating speech...")
-        
-        # Generate speech in a separate thread
-        speech_thread = threading.Thread(target=self._generate_speech, args=(ai_response,))
-        speech_thread.daemon = True
-        speech_thread.start()
+        self.set_status("Speaking...")
+        
+    def _generate_speech(self, speech_queue):
+        """Generate and play speech for each sentence put on the queue, until None"""
+        spoken = []
+        while True:
+            sentence = speech_queue.get()
+            if sentence is None:
+                break
+                
+            # Without an in-process player, speak the whole reply once at the end
+            if self._audio_channel is None:
+                spoken.append(sentence)
+                continue
+                
+            self._speak(sentence)
+            
+        if spoken:
+            self._speak("".join(spoken))
+            
+        # Release the UI once the last clip has finished
+        self.after(0, self._finish_speech)
         
-    def _generate_speech(self, text):
-        """Generate and play speech for the AI response"""
+    def _speak(self, text):
+        """Synthesize one piece of text and start playing it"""
         try:
-            # Create data directory if it doesn't exist
-            data_dir = pathlib.Path("data")
-            data_dir.mkdir(exist_ok=True)
-            
-            # Generate speech
-            mp3_filename = f"response_{self.conversation_count}.mp3"
-            file_path = data_dir / mp3_filename
-            success = synthesize_speech(text, str(file_path))
-            
-            if success:
-                # Update status
-                self.after(0, lambda: self.set_status("Playing audio..."))
-                
-                # Play the audio
-                if os.path.exists(file_path):
-                    try:
-                        os.startfile(file_path)
-                        
-                        # Wait for approximate playback duration
-                        words_per_second = 2.5  # Estimated speaking rate
-                        wait_time = min(len(text.split()) / words_per_second, 30)  # Cap at 30 seconds
-                        time.sleep(wait_time)
-                        
-                    except (AttributeError, OSError) as e:
-                        self.after(0, lambda: self.set_status(f"Could not play audio: {e}"))
+            # Generate speech; repeated phrases are served from the TTS cache
+            audio_path = synthesize_speech_cached(text)
+            if audio_path:
+                try:
+                    self._play_audio(audio_path)
+                except Exception as e:
+                    error_msg = f"Could not play audio: {e}"
+                    self.after(0, lambda: self.set_status(error_msg))
             else:
                 self.after(0, lambda: self.set_status("Speech generation failed"))
                 
         except Exception as e:
-            self.after(0, lambda: self.set_status(f"Speech generation error: {e}"))
+            error_msg = f"Speech generation error: {e}"
+            self.after(0, lambda: self.set_status(error_msg))
+            
+    def _play_audio(self, audio_path):
+        """Start playing an audio file, queueing it behind the clip that is playing
+        
+        Args:
+            audio_path: Path of the audio file to play
+        """
+        if self._audio_channel is None:
+            os.startfile(audio_path)
+            return
+            
+        sound = pygame.mixer.Sound(str(audio_path))
+        if self._audio_channel.get_busy():
+            # The channel holds one queued clip; wait for that slot to free up
+            while self._audio_channel.get_queue() is not None:
+                time.sleep(0.05)
+            self._audio_channel.queue(sound)
+        else:
+            self._audio_channel.play(sound)
+            
+    def _finish_speech(self):
+        """Wait on the Tk loop for playback to end, then reset the processing state"""
+        if self._audio_channel is not None and self._audio_channel.get_busy():
+            self.after(100, self._finish_speech)
+            return
             
-        # Reset processing state
         self.is_processing = False
         self.progress_bar.stop()
-        self.after(0, lambda: self.set_status("Ready"))
+        self.progress_bar.set(0)
+        self.set_status("Ready")
+        
+    def _trim_history(self):
+        """Keep the system prompt and only the most recent turns of the conversation"""
+        self.messages = trim_messages(self.messages, keep_turns=self.MAX_HISTORY_TURNS)
         
     def _clear_chat(self):
         """Clear the chat display and reset conversation"""
@@ -618,6 +918,8 @@ class ModernVoiceAssistantApp(ctk.CTk):
         
         # Clear the chat display
         self.message_frame.clear_messages()
+        self.thinking_message_index = None
+        self.response_message_index = None
         
         # Add welcome message
         self.message_frame.add_message(False, "Chat cleared. How can I help you today?")
@@ -626,49 +928,47 @@ class ModernVoiceAssistantApp(ctk.CTk):
     def set_status(self, status_text):
         """Set the status text"""
         self.status_var.set(status_text)
-        self.update_idletasks()
 
 
 def create_default_resources():
     """Create default resources if they don't exist"""
-    # Create resources directory
-    resources_dir = pathlib.Path("data/resources")
-    resources_dir.mkdir(exist_ok=True, parents=True)
-    
-    # Create a simple AI avatar if it doesn't exist
-    avatar_path = resources_dir / "ai_avatar.png"
-    if not os.path.exists(avatar_path):
+    # Nothing to do on a normal start
+    if AVATAR_PATH.exists():
+        return
+        
+    # Create a simple AI avatar
+    AVATAR_PATH.parent.mkdir(exist_ok=True, parents=True)
+    try:
+        # Create a simple colored icon image
+        icon_size = 64
+        icon_img = Image.new('RGBA', (icon_size, icon_size), color=(16, 163, 127, 255))
+        
+        # Add text "AI"
+        from PIL import ImageDraw, ImageFont
+        draw = ImageDraw.Draw(icon_img)
         try:
-            # Create a simple colored icon image
-            icon_size = 64
-            icon_img = Image.new('RGBA', (icon_size, icon_size), color=(16, 163, 127, 255))
-            
-            # Add text "AI"
-            from PIL import ImageDraw, ImageFont
-            draw = ImageDraw.Draw(icon_img)
-            try:
-                font = ImageFont.truetype("arial.ttf", 24)
-            except:
-                font = ImageFont.load_default()
-                
-            # Center the text
-            text = "AI"
-            try:
-                text_width = draw.textlength(text, font=font)
-            except:
-                # For older PIL versions
-                text_width = draw.textsize(text, font=font)[0]
-                
-            text_height = 24  # Approximate height
-            position = ((icon_size - text_width) // 2, (icon_size - text_height) // 2)
+            font = ImageFont.truetype("arial.ttf", 24)
+        except:
+            font = ImageFont.load_default()
             
-            # Draw text
-            draw.text(position, text, fill=(255, 255, 255, 255), font=font)
+        # Center the text
+        text = "AI"
+        try:
+            text_width = draw.textlength(text, font=font)
+        except:
+            # For older PIL versions
+            text_width = draw.textsize(text, font=font)[0]
             
-            # Save
-            icon_img.save(str(avatar_path), format='PNG')
-        except Exception as e:
-            print(f"Could not create AI avatar: {e}")
+        text_height = 24  # Approximate height
+        position = ((icon_size - text_width) // 2, (icon_size - text_height) // 2)
+        
+        # Draw text
+        draw.text(position, text, fill=(255, 255, 255, 255), font=font)
+        
+        # Save
+        icon_img.save(str(AVATAR_PATH), format='PNG')
+    except Exception as e:
+        print(f"Could not create AI avatar: {e}")
 
 
 if __name__ == "__main__":
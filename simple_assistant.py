@@ -7,18 +7,25 @@
 3. 语音播放功能
 """
 import os
+import io
+import re
 import sys
+import hashlib
 import time
+import queue
 import threading
-import pathlib
-import pygame
 import customtkinter as ctk
 from dotenv import load_dotenv
-import pyttsx3  # 作为语音合成的备选方案
-import speech_recognition as sr  # 直接导入语音识别库
+
+# pygame、pyttsx3和speech_recognition导入较慢，在第一次用到时才导入，窗口可以更快显示
+pygame = None
+
+# 本地语音识别（可选，未安装faster-whisper时使用在线识别）
+from voice_assistant.local_whisper import WHISPER_AVAILABLE, transcribe_audio_data
 
 # 导入AI服务模块
-from voice_assistant.ai_service import generate_response
+from voice_assistant.ai_service import generate_response_stream, trim_messages, FALLBACK_RESPONSE
+from voice_assistant.paths import DATA_DIR
 
 # 设置主题
 ctk.set_appearance_mode("Light")  # 使用浅色主题
@@ -44,25 +51,56 @@ KIDS_COLORS = {
     "send_hover": "#43A047"      # 发送按钮悬停 - 绿色
 }
 
+# 流式回复在句末标点处切分，每句话一完整就交给语音合成
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？.!?\n])")
+
 # 加载环境变量
 load_dotenv()
 
 # 创建数据目录
-data_dir = pathlib.Path("data")
+data_dir = DATA_DIR
 data_dir.mkdir(exist_ok=True)
 
-# 初始化pygame混音器（用于音频播放）
-pygame.mixer.init()
+# 放进语音队列时表示预热语音链路，而不是朗读文本
+SPEECH_WARM_UP = object()
+
+# 欢迎语音
+WELCOME_SPEECH = "你好，我是你的AI助手"
+
+# 常用的固定语音，启动时在后台提前合成到缓存
+COMMON_PROMPTS = (WELCOME_SPEECH, FALLBACK_RESPONSE)
+
+
+def init_audio():
+    """导入pygame并初始化混音器（每个进程只做一次）"""
+    global pygame
+    if pygame is not None:
+        return
+    import pygame as _pygame
+    
+    # 初始化pygame混音器（用于音频播放）；固定格式并加大缓冲区，避免CPU繁忙时爆音断续
+    _pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=4096)
+    _pygame.mixer.init()
+    pygame = _pygame
+
+
+# 消息框样式只构建一次，每条消息按发送者直接取用
+MESSAGE_FONT = ("Comic Sans MS", 14)  # 更友好的字体
+AVATAR_FONT = ("Arial", 16, "bold")
+AVATAR_SIZE = 36
+MESSAGE_STYLES = {
+    True: {"bg": KIDS_COLORS["user_msg"], "avatar_bg": KIDS_COLORS["accent"], "avatar_text": "U"},
+    False: {"bg": KIDS_COLORS["bot_msg"], "avatar_bg": "#FFB6C1", "avatar_text": "AI"},  # 浅粉色机器人
+}
 
 
 class RoundedMessageFrame(ctk.CTkFrame):
     """圆角消息框组件"""
     def __init__(self, master, message, is_user=False, **kwargs):
-        # 设置背景色
-        bg_color = KIDS_COLORS["user_msg"] if is_user else KIDS_COLORS["bot_msg"]
+        style = MESSAGE_STYLES[is_user]
         super().__init__(
             master, 
-            fg_color=bg_color, 
+            fg_color=style["bg"], 
             corner_radius=15,
             border_width=1,
             border_color=KIDS_COLORS["border"],
@@ -71,47 +109,41 @@ class RoundedMessageFrame(ctk.CTkFrame):
         
         self.grid_columnconfigure(1, weight=1)
         
-        # 内容容器
-        content_frame = ctk.CTkFrame(self, fg_color="transparent")
-        content_frame.grid(row=0, column=0, sticky="nsew", padx=20, pady=15)
-        
-        # 头像 - 使用更卡通化的图标
-        avatar_size = 36
-        avatar_frame = ctk.CTkFrame(
-            content_frame, 
-            width=avatar_size, 
-            height=avatar_size,
-            fg_color=KIDS_COLORS["accent"] if is_user else "#FFB6C1",  # 浅粉色机器人
-            corner_radius=avatar_size//2
-        )
-        avatar_frame.grid(row=0, column=0, padx=(0, 15), sticky="n")
-        avatar_frame.grid_propagate(False)
-        
-        # 使用可爱的表情符号作为头像
-        avatar_text = "U" if is_user else "AI"
+        # 头像 - 圆形标签直接显示文字，不再嵌套额外的框架
         avatar_label = ctk.CTkLabel(
-            avatar_frame, 
-            text=avatar_text,
+            self,
+            text=style["avatar_text"],
+            width=AVATAR_SIZE,
+            height=AVATAR_SIZE,
+            fg_color=style["avatar_bg"],
+            corner_radius=AVATAR_SIZE // 2,
             text_color="white",
-            font=("Arial", 16, "bold")
+            font=AVATAR_FONT
         )
-        avatar_label.place(relx=0.5, rely=0.5, anchor="center")
+        avatar_label.grid(row=0, column=0, padx=(20, 15), pady=15, sticky="n")
         
         # 消息文本 - 使用更大、更圆润的字体
-        message_label = ctk.CTkLabel(
-            content_frame,
+        self.message_label = ctk.CTkLabel(
+            self,
             text=message,
             wraplength=700,
             justify="left",
             text_color=KIDS_COLORS["text"],
             anchor="w",
-            font=("Comic Sans MS", 14)  # 更友好的字体
+            font=MESSAGE_FONT
         )
-        message_label.grid(row=0, column=1, sticky="w")
+        self.message_label.grid(row=0, column=1, padx=(0, 20), pady=15, sticky="w")
+    
+    def set_message(self, message):
+        """更新消息文本（用于流式显示回复）"""
+        self.message_label.configure(text=message)
 
 
 class SimpleAssistant(ctk.CTk):
     """简易对话助手"""
+    # 发送给模型的对话历史最多保留的轮数（系统提示始终保留）
+    MAX_HISTORY_TURNS = 8
+    
     def __init__(self):
         super().__init__()
         
@@ -125,8 +157,24 @@ class SimpleAssistant(ctk.CTk):
         self.count = 0
         self.messages = [{"role": "system", "content": "你是一个友好的助手，请使用简单友好的语言。"}]
         
-        # 设置TTS引擎
-        self.setup_tts_engine()
+        # 所有语音播放都由一个常驻线程按顺序完成，流式回复可以边生成边朗读；
+        # TTS引擎也在该线程中创建并只在该线程中使用，避免驱动被并发重入
+        self.tts_engine = None
+        self.speech_queue = queue.Queue()
+        self.playback_interrupted = threading.Event()
+        
+        # 环境噪音只在启动时校准一次（后台进行，不阻塞界面）；
+        # 识别器在所有录音之间共用，动态调整后的阈值可以保留到下一轮
+        self.energy_threshold = None
+        self._recognizer = None
+        self._recognizer_lock = threading.Lock()
+        
+        # 新消息框在空闲时批量布局
+        self._pending_messages = []
+        self._flush_scheduled = False
+        threading.Thread(target=self.calibrate_microphone, daemon=True).start()
+        threading.Thread(target=self.speech_worker, daemon=True).start()
+        threading.Thread(target=self.warm_speech_cache, daemon=True).start()
         
         # 创建界面
         self.create_widgets()
@@ -138,7 +186,8 @@ class SimpleAssistant(ctk.CTk):
         self.after(1000, self.play_welcome_message)
     
     def setup_tts_engine(self):
-        """设置文字转语音引擎"""
+        """设置文字转语音引擎（在语音线程中调用一次）"""
+        import pyttsx3  # 作为语音合成的备选方案
         self.tts_engine = pyttsx3.init()
         # 设置语速和声音
         self.tts_engine.setProperty('rate', 150)  # 语速适中
@@ -291,18 +340,29 @@ class SimpleAssistant(ctk.CTk):
     
     def add_user_message(self, message):
         """添加用户消息"""
-        msg = RoundedMessageFrame(self.chat_container, message, is_user=True)
-        msg.pack(fill="x", padx=10, pady=5)
-        
-        # 滚动到底部
-        self.chat_container._parent_canvas.yview_moveto(1.0)
+        return self.queue_message(RoundedMessageFrame(self.chat_container, message, is_user=True))
     
     def add_bot_message(self, message):
         """添加机器人消息"""
-        msg = RoundedMessageFrame(self.chat_container, message, is_user=False)
-        msg.pack(fill="x", padx=10, pady=5)
-        
-        # 滚动到底部
+        return self.queue_message(RoundedMessageFrame(self.chat_container, message, is_user=False))
+    
+    def queue_message(self, msg):
+        """把消息框放入待显示列表，空闲时统一布局并滚动，避免每条消息都重排一次"""
+        self._pending_messages.append(msg)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self.after_idle(self.flush_messages)
+        return msg
+    
+    def flush_messages(self):
+        """一次性显示所有待显示的消息框，然后滚动到底部"""
+        self._flush_scheduled = False
+        pending, self._pending_messages = self._pending_messages, []
+        for msg in pending:
+            msg.pack(fill="x", padx=10, pady=5)
+        
+        # 布局完成后再滚动，保证能滚到最新消息
+        self.update_idletasks()
         self.chat_container._parent_canvas.yview_moveto(1.0)
     
     def set_status(self, text):
@@ -314,16 +374,18 @@ class SimpleAssistant(ctk.CTk):
         if self.is_processing or self.is_recording:
             return
             
-        # 停止任何正在播放的音频
-        if pygame.mixer.music.get_busy():
+        # 停止任何正在播放的音频，并唤醒正在等待播放结束的语音线程
+        if pygame is not None and pygame.mixer.get_busy():
             print("停止正在播放的音频...")
-            pygame.mixer.music.stop()
+            pygame.mixer.stop()
+        self.playback_interrupted.set()
         
-        # 停止TTS引擎
-        try:
-            self.tts_engine.stop()
-        except:
-            pass
+        # 丢弃还没来得及朗读的句子
+        while True:
+            try:
+                self.speech_queue.get_nowait()
+            except queue.Empty:
+                break
             
         self.is_recording = True
         self.set_status("正在录音...请对着麦克风说话")
@@ -332,17 +394,39 @@ class SimpleAssistant(ctk.CTk):
         # 在后台线程执行录音
         threading.Thread(target=self.perform_recording, daemon=True).start()
     
+    def get_recognizer(self):
+        """返回共用的语音识别器（第一次使用时创建）"""
+        with self._recognizer_lock:
+            if self._recognizer is None:
+                import speech_recognition as sr
+                self._recognizer = sr.Recognizer()
+                self._recognizer.energy_threshold = 300  # 降低阈值，对较小声音更敏感
+                self._recognizer.dynamic_energy_threshold = True  # 动态调整阈值
+            return self._recognizer
+    
+    def calibrate_microphone(self):
+        """启动时校准一次环境噪音，之后每次录音直接复用这个阈值"""
+        try:
+            import speech_recognition as sr
+            recognizer = self.get_recognizer()
+            with sr.Microphone() as source:
+                recognizer.adjust_for_ambient_noise(source, duration=1)
+            self.energy_threshold = recognizer.energy_threshold
+        except Exception as e:
+            print(f"麦克风噪音校准失败: {e}")
+    
     def perform_recording(self):
         """执行录音过程"""
         try:
-            recognizer = sr.Recognizer()
-            recognizer.energy_threshold = 300  # 降低阈值，对较小声音更敏感
-            recognizer.dynamic_energy_threshold = True  # 动态调整阈值
+            import speech_recognition as sr
+            recognizer = self.get_recognizer()
             
             with sr.Microphone() as source:
-                # 调整环境噪音
-                self.after(0, lambda: self.set_status("正在调整麦克风噪音..."))
-                recognizer.adjust_for_ambient_noise(source, duration=1)
+                # 识别器保留着启动校准和上一轮动态调整后的阈值；校准还没完成时才在这里调整
+                if self.energy_threshold is None:
+                    self.after(0, lambda: self.set_status("正在调整麦克风噪音..."))
+                    recognizer.adjust_for_ambient_noise(source, duration=1)
+                    self.energy_threshold = recognizer.energy_threshold
                 
                 # 录制音频
                 self.after(0, lambda: self.set_status("请开始说话，说完后会自动识别"))
@@ -354,9 +438,22 @@ class SimpleAssistant(ctk.CTk):
                     self.after(0, lambda: self.reset_recording_button())
                     return
                     
-                # 试图识别
+                # 试图识别：优先使用本地Whisper模型，失败时再使用Google在线识别
                 try:
-                    user_text = recognizer.recognize_google(audio, language="zh-CN")
+                    user_text = None
+                    if WHISPER_AVAILABLE:
+                        try:
+                            user_text = transcribe_audio_data(audio, language="zh-CN")
+                        except Exception as e:
+                            print(f"本地语音识别出错: {e}，改用在线识别")
+                    if not user_text:
+                        # 上传前去掉首尾静音，减少上传和识别的音频长度
+                        try:
+                            from voice_assistant.vad_numba import trim_silence
+                            audio = trim_silence(audio, recognizer.energy_threshold)
+                        except ImportError:
+                            pass
+                        user_text = recognizer.recognize_google(audio, language="zh-CN")
                     if user_text:
                         # 在输入框中显示识别到的文本
                         self.after(0, lambda text=user_text: self.set_recognized_text(text))
@@ -411,67 +508,125 @@ class SimpleAssistant(ctk.CTk):
         # 显示用户消息
         self.add_user_message(user_text)
         
+        # 新一轮回复开始：清除上一轮录音留下的打断标记（必须在开始合成语音之前）
+        self.playback_interrupted.clear()
+        
         # 标记正在处理
         self.is_processing = True
         self.set_status("思考中...")
         self.count += 1
         
+        # “思考中”气泡在界面线程中创建，回复生成时直接在这个气泡里更新
+        thinking_message = self.add_bot_message("正在思考...")
+        
         # 在后台处理AI响应
-        threading.Thread(target=self.get_ai_response, args=(user_text,), daemon=True).start()
+        threading.Thread(
+            target=self.get_ai_response, args=(user_text, thinking_message), daemon=True
+        ).start()
+        
+        # AI生成回复的同时，让语音线程预热，第一句话可以马上开始合成
+        self.speech_queue.put(SPEECH_WARM_UP)
     
-    def get_ai_response(self, user_text):
-        """获取AI响应并显示"""
+    def get_ai_response(self, user_text, thinking_message):
+        """获取AI响应并显示（流式），每生成完一句就开始朗读
+        
+        在后台线程中运行，界面更新都通过after交给界面线程
+        """
         try:
             # 添加用户消息到历史
             self.messages.append({"role": "user", "content": user_text})
+            # 只保留最近几轮对话，请求长度不会随对话变长而一直增长
+            self.messages = trim_messages(self.messages, keep_turns=self.MAX_HISTORY_TURNS)
             
-            # 首先显示“思考中”消息
-            thinking_message = RoundedMessageFrame(self.chat_container, "正在思考...", is_user=False)
-            thinking_message.pack(fill="x", padx=10, pady=5)
-            # 滚动到底部
-            self.chat_container._parent_canvas.yview_moveto(1.0)
+            # 流式获取AI回复
+            parts = []
+            pending_text = ""
+            # 最多只排一次界面刷新，刷新时显示已收到的全部片段，不必每个片段都拼接一遍
+            refresh_pending = threading.Event()
             
-            # 获取AI回复
-            ai_response = generate_response(self.messages)
+            def refresh_message():
+                refresh_pending.clear()
+                thinking_message.set_message("".join(parts))
+            
+            for chunk in generate_response_stream(self.messages):
+                parts.append(chunk)
+                if not refresh_pending.is_set():
+                    refresh_pending.set()
+                    self.after(0, refresh_message)
+                
+                # 完整的句子立即交给语音线程
+                pending_text += chunk
+                sentences = SENTENCE_SPLIT_RE.split(pending_text)
+                pending_text = sentences.pop()
+                for sentence in sentences:
+                    if sentence.strip():
+                        self.speak_text(sentence)
+            if pending_text.strip():
+                self.speak_text(pending_text)
+            ai_response = "".join(parts)
             
             # 添加AI回复到历史
             self.messages.append({"role": "assistant", "content": ai_response})
             
-            # 移除“思考中”消息并显示真正的回复
-            thinking_message.destroy()
-            self.after(0, lambda: self.add_bot_message(ai_response))
-            self.after(0, lambda: self.set_status("正在生成语音..."))
-            
-            # 使用pyttsx3直接播放语音
-            self.speak_text(ai_response)
-            
-            # 处理完成
+            # 处理完成（语音在后台继续播放）
             self.after(0, lambda: self.set_status("准备好啦！"))
             self.is_processing = False
             
         except Exception as e:
-            self.after(0, lambda: self.set_status(f"处理出错: {e}"))
+            error_msg = f"处理出错: {e}"
+            self.after(0, lambda: self.set_status(error_msg))
             self.is_processing = False
     
     def speak_text(self, text):
-        """使用pyttsx3直接播放文本"""
+        """把要朗读的文本交给语音线程，按顺序播放"""
+        self.speech_queue.put(text)
+    
+    def speech_worker(self):
+        """常驻语音线程：依次朗读队列中的文本"""
+        try:
+            self.setup_tts_engine()
+        except Exception as e:
+            print(f"TTS引擎初始化错误: {e}")
+            
+        while True:
+            text = self.speech_queue.get()
+            try:
+                if text is SPEECH_WARM_UP:
+                    self.warm_up_speech()
+                else:
+                    self.speak_text_now(text)
+            except Exception as e:
+                print(f"语音播放总错误: {e}")
+    
+    def warm_up_speech(self):
+        """在等待AI回复时预热语音链路：初始化混音器并提前连上TTS服务器"""
+        init_audio()
+        from voice_assistant.text_to_speech import warm_up_connection
+        warm_up_connection()
+    
+    def warm_speech_cache(self):
+        """把常用的固定语音提前合成到缓存，用到时直接播放"""
+        from voice_assistant.audio_converter import warm_tts
+        warm_tts(COMMON_PROMPTS)
+    
+    def speak_text_now(self, text):
+        """在语音线程中合成并播放文本，播放完毕后返回（合成结果按文本缓存）"""
         try:
-            # 先尝试使用备用方法，即直接生成音频文件并使用pygame播放
+            # 先尝试使用备用方法，即直接生成语音并使用pygame播放
             # 这种方法对多次连续对话更稳定
             try:
                 # 导入文本转语音模块
-                from voice_assistant.text_to_speech import synthesize_speech
+                from voice_assistant.text_to_speech import synthesize_speech_bytes
                 
                 # 设置状态
                 self.after(0, lambda: self.set_status("正在生成语音..."))
                 
-                # 转换为语音文件，使用递增的计数器确保文件名不重复
-                mp3_filename = f"response_{self.count}_{int(time.time())}.mp3"
-                success = synthesize_speech(text, mp3_filename)
+                # 直接在内存中拿到音频数据；说过的话直接使用缓存，不再请求接口
+                audio_data = synthesize_speech_bytes(text)
                 
-                if success:
-                    # 使用pygame播放
-                    self.play_audio_with_pygame(mp3_filename)
+                if audio_data:
+                    # 使用pygame从内存播放，不再写出再读回文件
+                    self.play_audio_with_pygame(io.BytesIO(audio_data))
                     return  # 成功则直接返回
                 else:
                     print("生成音频文件失败，尝试备用方法...")
@@ -481,79 +636,79 @@ class SimpleAssistant(ctk.CTk):
             # 如果备用方法失败，尝试使用pyttsx3
             self.after(0, lambda: self.set_status("正在语音合成..."))
             
-            # 确保先停止之前的TTS引擎
-            try:
-                self.tts_engine.stop()
-            except:
-                pass
+            # pyttsx3的合成结果同样按文本缓存为wav
+            from voice_assistant.text_to_speech import TTS_CACHE_DIR
+            key = hashlib.blake2b(f"pyttsx3|{text}".encode("utf-8"), digest_size=16).hexdigest()
+            wav_path = TTS_CACHE_DIR / f"pyttsx3_{key}.wav"
+            if wav_path.is_file():
+                os.utime(wav_path)
+                self.play_audio_with_pygame(wav_path)
+                return
             
-            # 重新初始化TTS引擎
-            try:
-                self.tts_engine = pyttsx3.init()
-                self.tts_engine.setProperty('rate', 150)  # 语速适中
-                voices = self.tts_engine.getProperty('voices')
-                for voice in voices:
-                    if "chinese" in voice.id.lower() or "mandarin" in voice.id.lower():
-                        self.tts_engine.setProperty('voice', voice.id)
-                        break
-            except Exception as e:
-                print(f"TTS引擎初始化错误: {e}")
+            # 复用语音线程中常驻的TTS引擎
+            if self.tts_engine is None:
                 self.after(0, lambda: self.set_status("无法生成语音，但你可以阅读回复"))
                 return
             
-            # 使用线程来避免界面冻结
-            def do_speak():
-                try:
-                    self.after(0, lambda: self.set_status("正在说话..."))
-                    self.tts_engine.say(text)
-                    self.tts_engine.runAndWait()
-                    self.after(0, lambda: self.set_status("准备好啦！"))
-                except Exception as e:
-                    print(f"TTS语音播放失败: {e}")
-                    self.after(0, lambda: self.set_status("语音播放错误"))
+            # 先合成到缓存文件再播放；保存失败时直接朗读
+            try:
+                TTS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                self.tts_engine.save_to_file(text, str(wav_path))
+                self.tts_engine.runAndWait()
+                if wav_path.is_file():
+                    self.play_audio_with_pygame(wav_path)
+                    return
+            except Exception as e:
+                print(f"TTS语音保存失败: {e}")
             
-            # 启动新线程进行语音合成和播放
-            threading.Thread(target=do_speak, daemon=True).start()
+            # 已经在语音线程中，直接朗读
+            try:
+                self.after(0, lambda: self.set_status("正在说话..."))
+                self.tts_engine.say(text)
+                self.tts_engine.runAndWait()
+                self.after(0, lambda: self.set_status("准备好啦！"))
+            except Exception as e:
+                print(f"TTS语音播放失败: {e}")
+                self.after(0, lambda: self.set_status("语音播放错误"))
             
         except Exception as e:
             print(f"语音播放总错误: {e}")
             self.after(0, lambda: self.set_status(f"无法生成语音，但你可以阅读回复"))
     
-    def play_audio_with_pygame(self, mp3_filename):
-        """使用pygame播放音频文件"""
+    def play_audio_with_pygame(self, audio_path):
+        """使用pygame播放音频（刚写好的缓存文件Path或内存中的文件对象）
+        
+        文件缺失时pygame加载会报错，由下面的异常处理统一处理
+        """
         try:
-            # 获取音频文件完整路径
-            audio_path = str(pathlib.Path("data") / mp3_filename)
+            init_audio()
             
-            # 确保文件存在
-            if not os.path.exists(audio_path):
-                self.after(0, lambda: self.set_status(f"无法找到音频文件"))
-                return
-                
             self.after(0, lambda: self.set_status("正在播放..."))
             
             # 停止任何当前播放的音频
-            pygame.mixer.music.stop()
+            pygame.mixer.stop()
             
-            # 在子线程中播放音频，这样不会阻塞界面
-            def play_audio_thread():
-                try:
-                    # 加载并播放音频文件
-                    pygame.mixer.music.load(audio_path)
-                    pygame.mixer.music.play()
+            # 在语音线程中播放，播放完毕（或开始录音）后才返回
+            try:
+                # 加载并播放音频文件
+                sound = pygame.mixer.Sound(audio_path)
+                
+                # 合成或加载期间已经开始录音：不要把回复播放进麦克风
+                if self.is_recording or self.playback_interrupted.is_set():
+                    return
+                channel = sound.play()
+                
+                # 按音频长度等待，不再轮询；开始录音时会立即唤醒
+                if not self.playback_interrupted.wait(sound.get_length()):
+                    # 等待混音器缓冲区中剩余的音频播放完
+                    while channel is not None and channel.get_busy() and not self.is_recording:
+                        time.sleep(0.01)
                     
-                    # 等待音频播放完成，但允许外部中断
-                    while pygame.mixer.music.get_busy() and not self.is_recording:
-                        time.sleep(0.1)
-                        
-                    # 只有在非录音状态下更新状态
-                    if not self.is_recording:
-                        self.after(0, lambda: self.set_status("准备好啦！"))
-                except Exception as e:
-                    print(f"音频播放线程错误: {e}")
-            
-            # 启动新线程进行音频播放
-            threading.Thread(target=play_audio_thread, daemon=True).start()
+                # 只有在非录音状态下更新状态
+                if not self.is_recording:
+                    self.after(0, lambda: self.set_status("准备好啦！"))
+            except Exception as e:
+                print(f"音频播放线程错误: {e}")
             
         except Exception as e:
             self.after(0, lambda: self.set_status(f"播放音频出错: {e}"))
@@ -561,8 +716,7 @@ class SimpleAssistant(ctk.CTk):
     def play_welcome_message(self):
         """播放欢迎语音"""
         # 播放简短的欢迎语
-        welcome_text = "你好，我是你的AI助手"
-        self.speak_text(welcome_text)
+        self.speak_text(WELCOME_SPEECH)
     
     def clear_chat(self):
         """清空对话记录"""
@@ -583,15 +737,9 @@ class SimpleAssistant(ctk.CTk):
     
     def on_closing(self):
         """关闭窗口时的处理"""
-        # 停止语音引擎
-        try:
-            self.tts_engine.stop()
-        except:
-            pass
-            
         # 停止任何播放中的音频
-        if pygame.mixer.music.get_busy():
-            pygame.mixer.music.stop()
+        if pygame is not None and pygame.mixer.get_busy():
+            pygame.mixer.stop()
             
         # 关闭窗口
         self.destroy()
@@ -16,9 +16,8 @@ def main():
         # 确保数据目录存在
         os.makedirs("data/resources", exist_ok=True)
         
-        # 导入必要库
+        # 导入必要库（PIL由完整界面在需要时自行导入）
         import customtkinter as ctk
-        from PIL import Image, ImageTk
         
         # 设置外观
         ctk.set_appearance_mode("dark")
@@ -9,23 +9,27 @@ Core functionality:
 import os
 import sys
 import time
-import pathlib
 import pygame
 from dotenv import load_dotenv
 
 # Import voice assistant modules
-from voice_assistant.real_speech_to_text import record_and_transcribe
+from voice_assistant.real_speech_to_text import record_and_transcribe, warm_up
 from voice_assistant.text_to_speech import synthesize_speech
 from voice_assistant.ai_service import generate_response
+from voice_assistant.logging_setup import setup_logging
+from voice_assistant.paths import DATA_DIR
+from voice_assistant.commands import EXIT_RE
 
 # Load environment variables
 load_dotenv()
 
 # Set up directory for audio files
-data_dir = pathlib.Path("data")
+data_dir = DATA_DIR
 data_dir.mkdir(exist_ok=True)
 
-# Initialize pygame mixer for audio playback
+# Initialize pygame mixer for audio playback; a fixed format and a larger
+# buffer avoid renegotiation and underrun dropouts under CPU load
+pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=4096)
 pygame.init()
 pygame.mixer.init()
 
@@ -39,15 +43,16 @@ def play_audio(audio_path):
             return False
             
         # Stop any currently playing audio
-        pygame.mixer.music.stop()
+        pygame.mixer.stop()
         
         # Load and play the audio file
-        pygame.mixer.music.load(audio_path)
-        pygame.mixer.music.play()
+        sound = pygame.mixer.Sound(audio_path)
+        channel = sound.play()
         
-        # Wait for the audio to finish playing
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
+        # Sleep for the clip's known length instead of polling, then wait out the mixer buffer
+        time.sleep(sound.get_length())
+        while channel is not None and channel.get_busy():
+            time.sleep(0.01)
             
         print("Audio playback completed")
         return True
@@ -59,7 +64,9 @@ def voice_chat():
     """Simple voice chat implementation."""
     messages = [{"role": "system", "content": "You are a helpful assistant. Please answer concisely."}]
     count = 0
-    exit_phrases = {"exit", "quit", "bye", "结束", "退出", "再见"}
+    
+    # Open and calibrate the microphone while the user reads the banner
+    warm_up(duration=5, language="zh-CN")
     
     print("\n===== Simplified Voice Chat =====")
     print("- Speak or type your message")
@@ -88,7 +95,7 @@ def voice_chat():
         print(f"\nYou: {user_text}")
         
         # Check for exit command
-        if any(phrase in user_text.lower() for phrase in exit_phrases):
+        if EXIT_RE.search(user_text):
             print("Exiting voice chat.")
             break
             
@@ -111,6 +118,7 @@ def voice_chat():
         print("\n--------------------------------")
 
 if __name__ == "__main__":
+    setup_logging()
     try:
         voice_chat()
     except KeyboardInterrupt:
@@ -1,11 +1,203 @@
 """AI service module for voice assistant."""
 import os
+import json
+import uuid
+import hashlib
+import functools
+import threading
+import importlib.util
+import httpx
 from openai import OpenAI
+from voice_assistant.paths import DATA_DIR
+
+# HTTP/2 needs the optional h2 package; without it the client stays on HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Default context window sent with each request
+DEFAULT_KEEP_TURNS = 8
+DEFAULT_MAX_CHARS = 6000
+
+# Reply used when the model cannot be reached
+FALLBACK_RESPONSE = "抱歉，我现在无法回答。请稍后再试。"
+
+# Model used for every chat completion
+MODEL_NAME = "deepseek-chat"
+
+# Replies are cached on disk, keyed by the system prompt and the latest messages
+LLM_CACHE_DIR = DATA_DIR / "llm_cache"
+LLM_CACHE_CONTEXT = 4
+LLM_CACHE_MAX_BYTES = 20 * 1024 * 1024
+
+# Running size of the reply cache in bytes (None until first measured)
+_cache_bytes = None
+_cache_lock = threading.Lock()
+
+
+def trim_messages(messages, keep_turns=DEFAULT_KEEP_TURNS, max_chars=DEFAULT_MAX_CHARS):
+    """
+    Limit the conversation history sent to the model to a sliding window.
+    
+    The leading system prompt is always kept. The oldest user/assistant turns
+    are dropped until at most keep_turns turns remain and their total content
+    length is within max_chars (a rough stand-in for the token budget).
+    
+    Args:
+        messages: List of message dictionaries with 'role' and 'content' keys
+        keep_turns: Maximum number of user turns (with their replies) to keep
+        max_chars: Maximum total characters of the kept history
+        
+    Returns:
+        list: A new, possibly shorter, list of messages
+    """
+    if messages and messages[0]["role"] == "system":
+        head, history = messages[:1], messages[1:]
+    else:
+        head, history = [], messages
+    
+    # Start the window at a user turn so each kept reply still has its question
+    turn_starts = [i for i, message in enumerate(history) if message["role"] == "user"]
+    if len(turn_starts) > keep_turns:
+        history = history[turn_starts[-keep_turns]:]
+    
+    total = sum(len(message["content"] or "") for message in history)
+    while total > max_chars and len(history) > 1:
+        # Drop the oldest turn, but always keep the latest message
+        drop = 1
+        while drop < len(history) - 1 and history[drop]["role"] != "user":
+            drop += 1
+        total -= sum(len(message["content"] or "") for message in history[:drop])
+        history = history[drop:]
+    
+    return head + history
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """
+    Return the shared OpenAI client, created on first use.
+    
+    Keeping one client keeps its HTTP connection pool, so only the first
+    request of a session pays for the TCP/TLS handshake. Connections are
+    multiplexed over HTTP/2 when h2 is installed.
+    
+    Returns:
+        OpenAI: Client configured from the environment
+    """
+    http_client = httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=120)
+    )
+    # Initialize OpenAI client with API key and base URL from environment variables
+    return OpenAI(
+        api_key=os.getenv("DEEPSEEK_API_KEY"), 
+        base_url=os.getenv("BASE_URL", "https://api.deepseek.com"),
+        http_client=http_client
+    )
+
+
+def _llm_cache_path(messages):
+    """Return the cache file for a conversation, keyed by its system prompt and latest messages."""
+    context = messages[-LLM_CACHE_CONTEXT:]
+    if messages and messages[0]["role"] == "system" and len(messages) > LLM_CACHE_CONTEXT:
+        context = messages[:1] + context
+    key_source = json.dumps(
+        [MODEL_NAME, [(message["role"], message["content"]) for message in context]],
+        ensure_ascii=False
+    )
+    return LLM_CACHE_DIR / f"{hashlib.blake2b(key_source.encode('utf-8'), digest_size=16).hexdigest()}.txt"
+
+
+def _read_cached_response(messages):
+    """Return the cached reply for a conversation, or None on a cache miss."""
+    path = _llm_cache_path(messages)
+    try:
+        response = path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    try:
+        # Mark the entry as recently used for eviction
+        os.utime(path)
+    except OSError:
+        pass
+    return response
+
+
+def _scan_llm_cache():
+    """Return (stat, path) for every cached reply."""
+    return [(entry.stat(), entry) for entry in LLM_CACHE_DIR.glob("*.txt")]
+
+
+def _evict_llm_cache(added_path):
+    """
+    Account for a new cached reply and evict least recently used replies if the cache is over budget.
+    
+    Args:
+        added_path: Cache entry that was just written
+    """
+    global _cache_bytes
+    with _cache_lock:
+        try:
+            if _cache_bytes is None:
+                # First use in this process: measure once (includes the new entry)
+                _cache_bytes = sum(st.st_size for st, _ in _scan_llm_cache())
+            else:
+                _cache_bytes += added_path.stat().st_size
+            if _cache_bytes <= LLM_CACHE_MAX_BYTES:
+                return
+            entries = _scan_llm_cache()
+        except OSError:
+            return
+        total = sum(st.st_size for st, _ in entries)
+        # Oldest access time first
+        for st, entry in sorted(entries, key=lambda item: item[0].st_atime):
+            if total <= LLM_CACHE_MAX_BYTES:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+        _cache_bytes = total
+
+
+def _store_cached_response(messages, response):
+    """Cache a reply for a conversation; fallback replies are never cached."""
+    if not response or response == FALLBACK_RESPONSE:
+        return
+    path = _llm_cache_path(messages)
+    # Write then rename so a concurrent reader never sees a partial reply;
+    # the temporary name is unique so concurrent writers of one key don't collide
+    tmp_path = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.tmp")
+    try:
+        LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(response, encoding="utf-8")
+        os.replace(tmp_path, path)
+        _evict_llm_cache(path)
+    except OSError as e:
+        print(f"Could not cache AI response: {e}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+
+
+def warm_up_connection():
+    """
+    Open a connection to the LLM host ahead of time so the first request skips the TCP/TLS handshake.
+    
+    A cheap model listing is sent through the shared client, which leaves a
+    live connection in its keep-alive pool.
+    """
+    try:
+        _get_client().with_options(timeout=5, max_retries=0).models.list()
+    except Exception:
+        pass
 
 
 def generate_response(messages):
     """
-    Generate a response from the AI model.
+    Generate a response from the AI model, reusing a cached reply for a repeated conversation.
     
     Args:
         messages: List of message dictionaries with 'role' and 'content' keys
@@ -13,22 +205,77 @@ def generate_response(messages):
     Returns:
         str: The generated response text
     """
+    cached = _read_cached_response(messages)
+    if cached is not None:
+        return cached
+    
     try:
-        # Initialize OpenAI client with API key and base URL from environment variables
-        client = OpenAI(
-            api_key=os.getenv("DEEPSEEK_API_KEY"), 
-            base_url=os.getenv("BASE_URL")
-        )
+        # Reuse the shared client and its connection pool
+        client = _get_client()
         
         # Create a chat completion
         response = client.chat.completions.create(
-            model="deepseek-chat",  # Model name
+            model=MODEL_NAME,
             messages=messages,
             stream=False
         )
         
         # Return the generated text
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        _store_cached_response(messages, content)
+        return content
     except Exception as e:
         print(f"Error generating AI response: {e}")
-        return "抱歉，我现在无法回答。请稍后再试。"
+        return FALLBACK_RESPONSE
+
+
+def generate_response_stream(messages):
+    """
+    Stream a response from the AI model as it is generated.
+    
+    A cached reply for a repeated conversation is yielded in one piece.
+    
+    Args:
+        messages: List of message dictionaries with 'role' and 'content' keys
+        
+    Yields:
+        str: Successive pieces of the generated response text
+        
+    Returns:
+        bool: True if the whole reply was produced, False if the request failed
+            (possibly after some pieces were already yielded); read it from
+            StopIteration.value or as the result of "yield from"
+    """
+    cached = _read_cached_response(messages)
+    if cached is not None:
+        yield cached
+        return True
+    
+    parts = []
+    try:
+        # Reuse the shared client and its connection pool
+        client = _get_client()
+        
+        # Create a streaming chat completion
+        stream = client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=messages,
+            stream=True
+        )
+        
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        print(f"Error generating AI response: {e}")
+        if not parts:
+            yield FALLBACK_RESPONSE
+        return False
+    
+    # Only complete replies are cached
+    _store_cached_response(messages, "".join(parts))
+    return True
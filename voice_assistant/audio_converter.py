@@ -1,15 +1,36 @@
 """Audio conversion utilities for voice assistant."""
 import os
+import wave
+import asyncio
+import shutil
+import functools
 import subprocess
 import tempfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Encoding defaults by content type; the voice assistant pipeline uses "speech" end to end
+AUDIO_PROFILES = {
+    "speech": {"bitrate": "64k", "channels": 1, "sample_rate": 22050},
+    "music": {"bitrate": "192k"},
+}
+
+# Options that require re-encoding even when the output format matches the input
+REENCODE_OPTIONS = frozenset({"sample_rate", "channels", "bit_depth", "bitrate"})
+
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_path():
+    """Locate the ffmpeg executable once per process (None if it is not installed)."""
+    return shutil.which("ffmpeg")
 
 
 class AudioConverter:
     """Class for handling audio format conversions."""
     
     @staticmethod
-    def convert_audio(input_file, output_format="mp3", output_file=None, **kwargs):
+    def convert_audio(input_file, output_format="mp3", output_file=None, profile=None, **kwargs):
         """
         Convert audio file to specified format.
         
@@ -17,6 +38,8 @@ class AudioConverter:
             input_file (str): Path to input audio file
             output_format (str): Desired output format (mp3, wav, ogg, etc.)
             output_file (str, optional): Path to output file. If None, generates a name.
+            profile (str, optional): "speech" or "music" defaults from AUDIO_PROFILES;
+                explicit parameters below take precedence
             **kwargs: Additional conversion parameters
                 - sample_rate: Sample rate in Hz (e.g., 16000, 44100)
                 - channels: Number of audio channels (1=mono, 2=stereo)
@@ -26,49 +49,247 @@ class AudioConverter:
         Returns:
             str: Path to converted audio file, or None if conversion failed
         """
+        if profile:
+            kwargs = {**AUDIO_PROFILES[profile], **kwargs}
+        spec = dict(kwargs, format=output_format, output_file=output_file)
+        return AudioConverter.convert_audio_multi(input_file, [spec])[0]
+    
+    @staticmethod
+    def convert_audio_multi(input_file, outputs):
+        """
+        Convert one audio file to several outputs with a single ffmpeg run.
+        
+        The input is decoded once and encoded to every output, instead of
+        being decoded again for each format.
+        
+        Args:
+            input_file (str): Path to input audio file
+            outputs (list): One dict per output with keys
+                - format: Desired output format (mp3, wav, ogg, etc.), defaults to "mp3"
+                - output_file: Path to output file. If missing, generates a name.
+                - sample_rate, channels, bitrate: As for convert_audio
+        
+        Returns:
+            list: Path to each converted file (None where conversion failed), in order
+        """
+        specs = [AudioConverter._output_spec(input_file, output) for output in outputs]
+        
+        # Outputs in the input's format with nothing to re-encode are plain file copies
+        results = [None] * len(specs)
+        to_encode = []
+        for i, spec in enumerate(specs):
+            if AudioConverter._is_copy(input_file, spec):
+                results[i] = AudioConverter._copy_audio(input_file, spec["output_file"])
+            else:
+                to_encode.append(i)
+        
+        if to_encode:
+            encoded = AudioConverter._encode_outputs(input_file, [specs[i] for i in to_encode])
+            for i, output_file in zip(to_encode, encoded):
+                results[i] = output_file
+        return results
+    
+    @staticmethod
+    def _output_spec(input_file, output):
+        """Return a copy of an output spec with its format and output file filled in."""
+        spec = dict(output)
+        spec.setdefault("format", "mp3")
         # Generate output filename if not provided
-        if output_file is None:
-            input_path = Path(input_file)
-            output_file = str(input_path.with_suffix(f".{output_format}"))
+        if spec.get("output_file") is None:
+            spec["output_file"] = str(Path(input_file).with_suffix(f".{spec['format']}"))
+        return spec
+    
+    @staticmethod
+    def _is_copy(input_file, spec):
+        """Check whether an output has the input's format and needs no re-encoding."""
+        input_format = Path(input_file).suffix.lower().lstrip(".")
+        return spec["format"].lower() == input_format and not REENCODE_OPTIONS.intersection(spec)
+    
+    @staticmethod
+    def _copy_audio(input_file, output_file):
+        """
+        Copy an audio file that already has the requested format.
         
+        Returns:
+            str: Path to the output file, or None if the copy failed
+        """
+        try:
+            if not (Path(output_file).exists() and os.path.samefile(input_file, output_file)):
+                shutil.copyfile(input_file, output_file)
+            return output_file
+        except OSError as e:
+            print(f"Error copying audio file: {e}")
+            return None
+    
+    @staticmethod
+    def _encode_outputs(input_file, specs):
+        """
+        Encode the input to every output spec with one ffmpeg run.
+        
+        Args:
+            input_file (str): Path to input audio file
+            specs (list): Output dicts with format and output_file filled in
+        
+        Returns:
+            list: Path to each converted file (None where conversion failed), in order
+        """
         # Check if ffmpeg is available
         try:
-            # Try to use ffmpeg for conversion
-            cmd = ["ffmpeg", "-y", "-i", input_file]
+            ffmpeg = _ffmpeg_path()
+            if ffmpeg is None:
+                raise FileNotFoundError("ffmpeg")
             
-            # Add conversion parameters if provided
-            if "sample_rate" in kwargs:
-                cmd.extend(["-ar", str(kwargs["sample_rate"])])
-            if "channels" in kwargs:
-                cmd.extend(["-ac", str(kwargs["channels"])])
-            if "bitrate" in kwargs and output_format in ["mp3", "ogg"]:
-                cmd.extend(["-b:a", kwargs["bitrate"]])
-                
-            # Add output file
-            cmd.append(output_file)
+            # Try to use ffmpeg for conversion
+            cmd = AudioConverter._ffmpeg_command(ffmpeg, input_file, specs)
             
-            # Run conversion
-            subprocess.run(
-                cmd,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            # Run conversion; the error log goes to a temp file and is only read if ffmpeg fails
+            with tempfile.TemporaryFile() as error_log:
+                try:
+                    subprocess.run(
+                        cmd,
+                        check=True,
+                        stdout=subprocess.DEVNULL,
+                        stderr=error_log
+                    )
+                except subprocess.CalledProcessError:
+                    error_log.seek(0)
+                    print(f"ffmpeg error: {error_log.read().decode('utf-8', 'replace').strip()}")
+                    raise
             
-            return output_file
+            return [spec["output_file"] for spec in specs]
         except (subprocess.SubprocessError, FileNotFoundError):
             print("ffmpeg not available, using fallback conversion method")
-            return AudioConverter._fallback_convert(input_file, output_format, output_file, **kwargs)
+            return AudioConverter._fallback_outputs(input_file, specs)
+    
+    @staticmethod
+    def _ffmpeg_command(ffmpeg, input_file, specs):
+        """Build one ffmpeg command line that writes every output spec."""
+        # Skip the banner and stdin handling ffmpeg does not need here
+        cmd = [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", str(input_file)]
+        
+        # Each output's parameters come right before its file name
+        for spec in specs:
+            if "sample_rate" in spec:
+                cmd.extend(["-ar", str(spec["sample_rate"])])
+            if "channels" in spec:
+                cmd.extend(["-ac", str(spec["channels"])])
+            if "bitrate" in spec and spec["format"] in ["mp3", "ogg"]:
+                cmd.extend(["-b:a", spec["bitrate"]])
+            cmd.append(str(spec["output_file"]))
+        return cmd
+    
+    @staticmethod
+    def _fallback_outputs(input_file, specs):
+        """Convert every output spec with the fallback converters."""
+        results = []
+        for spec in specs:
+            params = {key: value for key, value in spec.items() if key not in ("format", "output_file")}
+            results.append(AudioConverter._fallback_convert(
+                input_file, spec["format"], spec["output_file"], **params
+            ))
+        return results
+    
+    @staticmethod
+    async def convert_audio_async(input_file, output_format="mp3", output_file=None, profile=None, **kwargs):
+        """
+        Convert an audio file without blocking the running event loop.
+        
+        ffmpeg runs as an asyncio subprocess; copies and the fallback
+        converters run in a worker thread.
+        
+        Args:
+            Same as convert_audio
+        
+        Returns:
+            str: Path to converted audio file, or None if conversion failed
+        """
+        if profile:
+            kwargs = {**AUDIO_PROFILES[profile], **kwargs}
+        spec = AudioConverter._output_spec(
+            input_file, dict(kwargs, format=output_format, output_file=output_file)
+        )
+        ffmpeg = _ffmpeg_path()
+        if ffmpeg is None or AudioConverter._is_copy(input_file, spec):
+            return await asyncio.to_thread(
+                AudioConverter.convert_audio, input_file, output_format, spec["output_file"], **kwargs
+            )
+        
+        process = await asyncio.create_subprocess_exec(
+            *AudioConverter._ffmpeg_command(ffmpeg, input_file, [spec]),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, error_log = await process.communicate()
+        if process.returncode == 0:
+            return spec["output_file"]
+        
+        print(f"ffmpeg error: {error_log.decode('utf-8', 'replace').strip()}")
+        results = await asyncio.to_thread(AudioConverter._fallback_outputs, input_file, [spec])
+        return results[0]
+    
+    @staticmethod
+    async def convert_audio_batch_async(inputs, output_format="mp3", max_workers=None, **kwargs):
+        """
+        Convert several audio files concurrently from an event loop.
+        
+        Args:
+            Same as convert_audio_batch
+        
+        Returns:
+            list: Path to each converted file (None where conversion failed), in input order
+        """
+        limit = asyncio.Semaphore(max_workers or os.cpu_count())
+        
+        async def convert(input_file):
+            async with limit:
+                return await AudioConverter.convert_audio_async(
+                    input_file, output_format=output_format, **kwargs
+                )
+        
+        return list(await asyncio.gather(*(convert(input_file) for input_file in inputs)))
+    
+    @staticmethod
+    def convert_audio_batch(inputs, output_format="mp3", max_workers=None, **kwargs):
+        """
+        Convert several audio files to the same format in parallel.
+        
+        Each file gets its own ffmpeg process; the processes run concurrently
+        so the encoders use all cores instead of converting one file at a time.
+        
+        Args:
+            inputs (list): Paths to input audio files
+            output_format (str): Desired output format (mp3, wav, ogg, etc.)
+            max_workers (int, optional): Maximum concurrent conversions. Defaults to the CPU count.
+            **kwargs: Conversion parameters, as for convert_audio
+        
+        Returns:
+            list: Path to each converted file (None where conversion failed), in input order
+        """
+        def convert(input_file):
+            return AudioConverter.convert_audio(input_file, output_format=output_format, **kwargs)
+        
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            return list(executor.map(convert, inputs))
     
     @staticmethod
     def _fallback_convert(input_file, output_format, output_file, **kwargs):
         """
         Fallback conversion method using Python libraries.
         
-        This is used when ffmpeg is not available.
+        This is used when ffmpeg is not available. WAV/MP3 conversions are
+        done in-process when lameenc/miniaudio are installed; pydub is the last
+        resort since it needs ffmpeg itself.
         """
         try:
-            import wave
+            result = AudioConverter._native_convert(input_file, output_format, output_file, **kwargs)
+            if result:
+                return result
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"In-process conversion failed: {e}")
+        
+        try:
             from pydub import AudioSegment
             
             # Use pydub for conversion
@@ -94,6 +315,97 @@ class AudioConverter:
             print("pydub not available for fallback conversion")
             return None
 
+    @staticmethod
+    def _native_convert(input_file, output_format, output_file, **kwargs):
+        """
+        Convert between WAV and MP3 with Python audio libraries, without spawning ffmpeg.
+        
+        Raises:
+            ImportError: If lameenc (WAV to MP3) or miniaudio (MP3 to WAV) is not installed
+        
+        Returns:
+            str: Path to converted audio file, or None if the conversion is not supported here
+        """
+        suffix = Path(input_file).suffix.lower()
+        output_format = output_format.lower()
+        
+        if suffix == ".wav" and output_format == "mp3":
+            import lameenc
+            
+            with wave.open(str(input_file), "rb") as wav_file:
+                channels = wav_file.getnchannels()
+                sample_rate = wav_file.getframerate()
+                sample_width = wav_file.getsampwidth()
+                pcm = wav_file.readframes(wav_file.getnframes())
+            # lameenc only encodes 16-bit PCM
+            if sample_width != 2:
+                return None
+            
+            target_channels = kwargs.get("channels", channels)
+            target_rate = kwargs.get("sample_rate", sample_rate)
+            if (target_channels, target_rate) != (channels, sample_rate):
+                pcm, channels, sample_rate = AudioConverter._remix_pcm(
+                    pcm, channels, sample_rate, target_channels, target_rate
+                )
+            
+            encoder = lameenc.Encoder()
+            encoder.set_bit_rate(int(str(kwargs.get("bitrate", "128k")).rstrip("kK")))
+            encoder.set_in_sample_rate(sample_rate)
+            encoder.set_channels(channels)
+            encoder.set_quality(2)
+            Path(output_file).write_bytes(bytes(encoder.encode(pcm) + encoder.flush()))
+            return output_file
+        
+        if suffix == ".mp3" and output_format == "wav":
+            import miniaudio
+            
+            decoded = miniaudio.decode_file(
+                str(input_file),
+                output_format=miniaudio.SampleFormat.SIGNED16,
+                nchannels=kwargs.get("channels", 1),
+                sample_rate=kwargs.get("sample_rate", 44100)
+            )
+            with wave.open(str(output_file), "wb") as wav_file:
+                wav_file.setnchannels(decoded.nchannels)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(decoded.sample_rate)
+                wav_file.writeframes(decoded.samples.tobytes())
+            return output_file
+        
+        return None
+
+    @staticmethod
+    def _remix_pcm(pcm, channels, sample_rate, target_channels, target_rate):
+        """
+        Change the channel count and sample rate of 16-bit PCM with NumPy and soxr.
+        
+        Args:
+            pcm (bytes): Interleaved 16-bit samples
+            channels (int): Channels in pcm
+            sample_rate (int): Sample rate of pcm
+            target_channels (int): Desired channel count (mono/stereo mixes are supported)
+            target_rate (int): Desired sample rate
+        
+        Raises:
+            ImportError: If numpy, or soxr when resampling, is not installed
+        
+        Returns:
+            tuple: (pcm bytes, channels, sample_rate) after conversion
+        """
+        import numpy as np
+        
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+        if target_channels == 1 and channels > 1:
+            samples = samples.mean(axis=1, dtype=np.int32).astype(np.int16)[:, np.newaxis]
+        elif target_channels > 1 and channels == 1:
+            samples = np.repeat(samples, target_channels, axis=1)
+        
+        if target_rate != sample_rate:
+            import soxr
+            samples = soxr.resample(samples, sample_rate, target_rate, quality="HQ")
+        
+        return np.ascontiguousarray(samples).tobytes(), samples.shape[1], target_rate
+
     @staticmethod
     def text_to_speech(text, output_file=None, voice_type="female", language="zh"):
         """
@@ -103,27 +415,45 @@ class AudioConverter:
         
         Args:
             text (str): Text to convert to speech
-            output_file (str, optional): Path to output file. If None, generates a temp file.
+            output_file (str, optional): Path to output file. If None, returns the cached
+                audio file, which callers must not modify or delete.
             voice_type (str): Voice type (male, female)
             language (str): Language code (en, zh, etc.)
             
         Returns:
             str: Path to generated audio file
         """
-        from voice_assistant.text_to_speech import synthesize_speech
+        from voice_assistant.text_to_speech import synthesize_speech, synthesize_speech_cached
         
-        # Generate output filename if not provided
+        # Without an output file, hand back the shared cache entry instead of a fresh temp copy
         if output_file is None:
-            temp_fd, output_file = tempfile.mkstemp(suffix=".mp3")
-            os.close(temp_fd)
+            return synthesize_speech_cached(text)
         
-        # Call the TTS function
+        # Call the TTS function (served from the TTS cache for repeated text)
         success = synthesize_speech(text, output_file)
         
         if success:
             return output_file
         return None
     
+    @staticmethod
+    def warm_tts(prompts, voice_type="female", language="zh"):
+        """
+        Synthesize common prompts ahead of time so they are served from the TTS cache.
+        
+        Prompts that are already cached are skipped without an API call.
+        
+        Args:
+            prompts (list): Texts to synthesize
+            voice_type (str): Voice type (male, female)
+            language (str): Language code (en, zh, etc.)
+        """
+        for prompt in prompts:
+            try:
+                AudioConverter.text_to_speech(prompt, voice_type=voice_type, language=language)
+            except Exception as e:
+                print(f"Error warming TTS cache: {e}")
+    
     @staticmethod
     def speech_to_text(audio_file, language="zh"):
         """
@@ -154,13 +484,26 @@ class AudioConverter:
 
 
 # Utility functions for common conversions
-def wav_to_mp3(wav_file, mp3_file=None, bitrate="192k"):
-    """Convert WAV to MP3."""
+def wav_to_mp3(wav_file, mp3_file=None, bitrate=None, profile="speech"):
+    """Convert WAV to MP3 (64 kbps 22.05 kHz mono for speech by default)."""
+    options = {"bitrate": bitrate} if bitrate else {}
     return AudioConverter.convert_audio(
         wav_file, 
         output_format="mp3", 
         output_file=mp3_file,
-        bitrate=bitrate
+        profile=profile,
+        **options
+    )
+
+def wav_to_mp3_batch(wav_files, bitrate=None, max_workers=None, profile="speech"):
+    """Convert several WAV files to MP3 in parallel."""
+    options = {"bitrate": bitrate} if bitrate else {}
+    return AudioConverter.convert_audio_batch(
+        wav_files, 
+        output_format="mp3", 
+        max_workers=max_workers,
+        profile=profile,
+        **options
     )
 
 def mp3_to_wav(mp3_file, wav_file=None, sample_rate=16000, channels=1):
@@ -177,6 +520,10 @@ def generate_speech(text, output_file=None):
     """Generate speech from text."""
     return AudioConverter.text_to_speech(text, output_file)
 
+def warm_tts(prompts):
+    """Pre-synthesize prompts into the TTS cache."""
+    AudioConverter.warm_tts(prompts)
+
 def transcribe_audio(audio_file):
     """Transcribe audio to text."""
     return AudioConverter.speech_to_text(audio_file)
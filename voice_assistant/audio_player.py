@@ -2,10 +2,31 @@
 音频播放器模块 - 使用Windows本地音频库在程序内播放音频
 """
 import os
+import ctypes
+import itertools
 import threading
-import time
 import platform
 
+# 每次播放使用不同的MCI设备别名，避免新旧播放互相影响
+_alias_counter = itertools.count()
+
+
+def _mci(command):
+    """
+    发送一条MCI命令（Windows多媒体接口）
+    
+    参数:
+        command: MCI命令字符串
+    
+    返回:
+        str: 命令返回的文本
+    """
+    buffer = ctypes.create_unicode_buffer(256)
+    error = ctypes.windll.winmm.mciSendStringW(command, buffer, len(buffer) - 1, None)
+    if error:
+        raise RuntimeError(f"MCI命令失败({error}): {command}")
+    return buffer.value
+
 class AudioPlayer:
     """在GUI应用中直接播放音频的播放器类"""
     
@@ -13,7 +34,7 @@ class AudioPlayer:
         """初始化音频播放器"""
         self.is_playing = False
         self.play_thread = None
-        self.current_process = None
+        self.current_alias = None
         
     def play(self, audio_file, callback=None):
         """
@@ -35,38 +56,36 @@ class AudioPlayer:
             # 停止当前正在播放的声音
             self.stop()
             
-            # 使用Windows的winsound播放音频
+            # 使用Windows的MCI播放音频（支持mp3和wav，播放结束时才返回）
             if platform.system() == 'Windows':
-                import winsound
+                alias = f"va_player_{next(_alias_counter)}"
+                _mci(f'open "{os.path.abspath(audio_file)}" type mpegvideo alias {alias}')
                 
                 # 标记为正在播放
                 self.is_playing = True
+                self.current_alias = alias
                 
                 # 在单独的线程中播放音频
                 def play_in_thread():
                     try:
-                        # 播放音频 (SND_FILENAME 表示使用文件名，SND_ASYNC 表示异步播放，SND_NODEFAULT 防止弹出播放器窗口)
-                        flags = winsound.SND_FILENAME | winsound.SND_ASYNC | winsound.SND_NODEFAULT
-                        winsound.PlaySound(audio_file, flags)
-                        
-                        # 估算播放时间
-                        file_size = os.path.getsize(audio_file)
-                        # 估算MP3播放时间
-                        estimated_seconds = file_size / (44100 * 2)
-                        wait_time = max(1, min(estimated_seconds, 30))
-                        time.sleep(wait_time)
+                        # wait表示在音频真正播放完（或被stop打断）后才返回
+                        _mci(f"play {alias} wait")
+                    except Exception as e:
+                        print(f"播放线程中发生错误: {e}")
+                    finally:
+                        try:
+                            _mci(f"close {alias}")
+                        except Exception:
+                            pass
                         
-                        # 播放结束后更新状态
-                        self.is_playing = False
+                        # 播放结束后更新状态（已开始新的播放时不覆盖）
+                        if self.current_alias == alias:
+                            self.is_playing = False
+                            self.current_alias = None
                         
                         # 回调函数
                         if callback:
                             callback()
-                    except Exception as e:
-                        print(f"播放线程中发生错误: {e}")
-                        self.is_playing = False
-                        if callback:
-                            callback()
                 
                 # 启动线程
                 self.play_thread = threading.Thread(target=play_in_thread)
@@ -89,10 +108,11 @@ class AudioPlayer:
             return
             
         try:
-            if platform.system() == 'Windows':
-                import winsound
-                winsound.PlaySound(None, winsound.SND_PURGE)
+            if platform.system() == 'Windows' and self.current_alias:
+                # 停止后播放线程中的"play ... wait"会立即返回并关闭设备
+                _mci(f"stop {self.current_alias}")
             self.is_playing = False
+            self.current_alias = None
         except Exception as e:
             print(f"停止音频时出错: {e}")
         
@@ -0,0 +1,6 @@
+"""Spoken or typed commands recognized by the voice assistant front ends."""
+import re
+
+# Exit commands; English words must not be part of a longer word (e.g. "byelaw"),
+# but may sit directly next to Chinese text, which \b would treat as a word character
+EXIT_RE = re.compile(r"(?<![a-z])(?:bye|exit|quit|break out)(?![a-z])|结束|退出|拜拜|再见", re.IGNORECASE)
@@ -0,0 +1,61 @@
+"""
+Local speech recognition with faster-whisper.
+
+Transcribes recorded audio on the CPU with an INT8-quantized Whisper model,
+so recognition does not need a network round trip. faster-whisper is
+optional; callers check WHISPER_AVAILABLE and fall back to online
+recognition when it is missing.
+"""
+import os
+import functools
+import importlib.util
+
+# Checked without importing: faster-whisper pulls in CTranslate2 and is only loaded on first use
+WHISPER_AVAILABLE = (
+    importlib.util.find_spec("faster_whisper") is not None
+    and importlib.util.find_spec("numpy") is not None
+)
+
+# Model size can be overridden, e.g. "base" on slow machines or "medium" for accuracy
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "small")
+
+# Greedy decoding by default: much faster than beam search for short utterances
+WHISPER_BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "1"))
+
+# Whisper expects 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+
+@functools.lru_cache(maxsize=1)
+def _get_model():
+    """Load the Whisper model once per process."""
+    from faster_whisper import WhisperModel
+    return WhisperModel(WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
+
+
+def transcribe_audio_data(audio, language="zh-CN", beam_size=None):
+    """
+    Transcribe a speech_recognition AudioData clip with the local Whisper model.
+
+    Leading/trailing silence and pauses are dropped by the model's built-in
+    VAD filter before decoding.
+
+    Args:
+        audio: speech_recognition.AudioData holding the recording
+        language: Language code such as "zh-CN" or "en-US"
+        beam_size: Decoding beam width (defaults to WHISPER_BEAM_SIZE)
+
+    Returns:
+        str: The recognized text ("" if nothing was recognized)
+    """
+    from voice_assistant.pcm import i16_to_f32
+    
+    samples = i16_to_f32(audio.get_raw_data(convert_rate=WHISPER_SAMPLE_RATE, convert_width=2))
+
+    segments, _ = _get_model().transcribe(
+        samples,
+        language=language.split("-")[0],
+        beam_size=beam_size or WHISPER_BEAM_SIZE,
+        vad_filter=True
+    )
+    return "".join(segment.text for segment in segments).strip()
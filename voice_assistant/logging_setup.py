@@ -0,0 +1,47 @@
+"""
+Non-blocking logging for the voice assistant.
+
+Records are put on a queue by the calling thread and written to the console
+by a background listener, so status messages from the microphone loop never
+wait on a slow console write.
+"""
+import atexit
+import queue
+import logging
+import logging.handlers
+
+# Logger used by the speech recognition modules
+STT_LOGGER_NAME = "voice_assistant.stt"
+
+_listener = None
+
+
+def setup_logging(level=logging.INFO):
+    """
+    Route voice_assistant log records through a queue to a console handler.
+
+    Call once at application start; later calls only change the level.
+
+    Args:
+        level: Minimum level to show (logging.DEBUG includes microphone details)
+
+    Returns:
+        logging.handlers.QueueListener: The running listener
+    """
+    global _listener
+    logger = logging.getLogger("voice_assistant")
+    logger.setLevel(level)
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S"))
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, console, respect_handler_level=True)
+    _listener.start()
+    # Write out records still queued when the program ends
+    atexit.register(_listener.stop)
+    return _listener
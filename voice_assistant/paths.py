@@ -0,0 +1,6 @@
+"""Filesystem locations shared by the voice assistant modules."""
+import pathlib
+
+# Generated audio, caches and saved conversations live next to the package,
+# so they are found regardless of the working directory the app starts from
+DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / "data"
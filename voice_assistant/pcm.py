@@ -0,0 +1,26 @@
+"""
+Sample format conversion for raw PCM audio.
+
+Needs numpy; callers import it where numpy is already required.
+"""
+import numpy as np
+
+# Scale from int16 samples to floats in [-1.0, 1.0)
+INT16_SCALE = 1.0 / 32768.0
+
+
+def i16_to_f32(buffer):
+    """
+    Convert 16-bit little-endian PCM to float32 samples.
+
+    The samples are scaled in place, so only one float array is allocated.
+
+    Args:
+        buffer: Bytes of int16 samples
+
+    Returns:
+        numpy.ndarray: float32 samples in [-1.0, 1.0)
+    """
+    samples = np.frombuffer(buffer, dtype=np.int16).astype(np.float32)
+    samples *= INT16_SCALE
+    return samples
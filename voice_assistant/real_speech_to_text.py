@@ -1,13 +1,156 @@
 """Real speech-to-text module using PyAudio and SpeechRecognition."""
 import os
+import sys
 import time
+import re
+import json
+import queue
+import atexit
+import logging
+import functools
+import threading
+import concurrent.futures
 import speech_recognition as sr
-from datetime import datetime
+from voice_assistant.google_speech import recognize_google
+from voice_assistant.local_whisper import WHISPER_AVAILABLE, transcribe_audio_data
+from voice_assistant.logging_setup import STT_LOGGER_NAME, setup_logging
+from voice_assistant.paths import DATA_DIR
+
+log = logging.getLogger(STT_LOGGER_NAME)
+
+# Compiled energy detector for the listen loop (needs numpy; numba is optional)
+try:
+    from voice_assistant.vad_numba import listen as fast_listen
+except ImportError:
+    fast_listen = None
+
+# Neural end-of-speech detection (optional, needs silero-vad)
+from voice_assistant.vad_silero import SILERO_AVAILABLE, VAD_SAMPLE_RATE, VAD_FRAME_SIZE
+
+# Preferred microphones: array microphones, skipping devices whose name mentions "input"
+PREFERRED_MIC_RE = re.compile(r"^(?!.*input).*(麦克风阵列|microphone array)", re.IGNORECASE)
+
+# Recognition requests run here so capture can continue during the round trip;
+# bounded so a slow network cannot pile up unbounded concurrent requests
+_STT_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="stt")
+
+# Last measured ambient noise threshold, reused across launches while fresh
+MIC_CALIBRATION_FILE = DATA_DIR / "mic.json"
+MIC_CALIBRATION_MAX_AGE = 3600  # seconds
+
+
+def load_energy_threshold():
+    """
+    Return the saved energy threshold if it was measured recently.
+    
+    Setting the MIC_RECALIBRATE environment variable ignores the saved value.
+    
+    Returns:
+        float: The saved threshold, or None if missing, stale or unreadable
+    """
+    if os.getenv("MIC_RECALIBRATE"):
+        return None
+    try:
+        calibration = json.loads(MIC_CALIBRATION_FILE.read_text(encoding="utf-8"))
+        if time.time() - calibration["ts"] < MIC_CALIBRATION_MAX_AGE:
+            return float(calibration["energy_threshold"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def save_energy_threshold(energy_threshold):
+    """
+    Save a measured energy threshold for later launches.
+    
+    Args:
+        energy_threshold: Threshold set by adjust_for_ambient_noise
+    """
+    try:
+        MIC_CALIBRATION_FILE.parent.mkdir(exist_ok=True)
+        MIC_CALIBRATION_FILE.write_text(
+            json.dumps({"energy_threshold": energy_threshold, "ts": time.time()}),
+            encoding="utf-8"
+        )
+    except OSError as e:
+        log.debug("Could not save microphone calibration: %s", e)
+
+
+def discard_buffered_audio(source):
+    """
+    Drop audio an open microphone buffered while nobody was reading it.
+    
+    Keeps a shared stream from handing stale input (such as the end of the
+    assistant's own reply) to the next listen.
+    
+    Args:
+        source: Open speech_recognition.Microphone
+    """
+    try:
+        stream = source.stream.pyaudio_stream
+        available = stream.get_read_available()
+        if available:
+            stream.read(available, exception_on_overflow=False)
+    except (AttributeError, OSError):
+        pass
+
+
+def open_microphone(device_index=None):
+    """
+    Open a microphone stream suited to the available voice activity detector.
+    
+    With Silero VAD installed the stream is opened at 16 kHz in 512-sample
+    chunks, the frame format the model expects.
+    
+    Args:
+        device_index: PyAudio device index (None for the default device)
+        
+    Returns:
+        speech_recognition.Microphone: An entered microphone source
+    """
+    if SILERO_AVAILABLE:
+        microphone = sr.Microphone(device_index=device_index, sample_rate=VAD_SAMPLE_RATE, chunk_size=VAD_FRAME_SIZE)
+    else:
+        microphone = sr.Microphone(device_index=device_index)
+    return microphone.__enter__()
+
+
+def listen_phrase(recognizer, source, timeout=None, phrase_time_limit=None):
+    """
+    Record one phrase from an open microphone with the best available detector.
+    
+    Silero VAD is used for 16 kHz streams when installed, then the compiled
+    energy detector, then speech_recognition's own listen loop.
+    
+    Args:
+        recognizer: speech_recognition.Recognizer holding the detection settings
+        source: Open speech_recognition.Microphone
+        timeout: Maximum seconds to wait for the phrase to start
+        phrase_time_limit: Maximum seconds for the phrase
+        
+    Returns:
+        AudioData: The recorded phrase
+    """
+    discard_buffered_audio(source)
+    if SILERO_AVAILABLE and source.SAMPLE_RATE == VAD_SAMPLE_RATE and source.SAMPLE_WIDTH == 2:
+        from voice_assistant.vad_silero import listen as vad_listen
+        return vad_listen(recognizer, source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+    if fast_listen is not None and source.SAMPLE_WIDTH == 2:
+        return fast_listen(recognizer, source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+    return recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
 
 
 class SpeechRecognizer:
     """Class for handling real-time speech recognition."""
     
+    # Microphone names and the chosen device, looked up once per process (PyAudio enumeration is slow)
+    _mic_names = None
+    _mic_index = None
+    
+    # Microphone stream opened once and shared by every turn
+    _source = None
+    _source_lock = threading.Lock()
+    
     def __init__(self, language="zh-CN", timeout=5, phrase_time_limit=None):
         """
         Initialize the speech recognizer.
@@ -18,128 +161,285 @@ class SpeechRecognizer:
             phrase_time_limit: Maximum seconds for a single phrase
         """
         self.recognizer = sr.Recognizer()
+        # Give up on a stalled recognition request instead of blocking forever
+        self.recognizer.operation_timeout = 10
         self.language = language
         self.timeout = timeout
         self.phrase_time_limit = phrase_time_limit
+        # Recording cap for one phrase: the configured limit, at most 15 seconds
+        self.phrase_limit = min(phrase_time_limit, 15) if phrase_time_limit else 15
         
-        # Adjust for ambient noise level
-        self.energy_threshold = 300  # Default value
+        # Adjust for ambient noise level; a recent measurement from an earlier launch is reused
+        saved_threshold = load_energy_threshold()
+        self.energy_threshold = saved_threshold or 300  # Default value
         self.dynamic_energy_threshold = True
+        self.calibrated = saved_threshold is not None
+        self._calibration_thread = None
+    
+    @classmethod
+    def microphone_names(cls):
+        """
+        Return the names of the available microphones.
+        
+        Returns:
+            list: Device names, indexed like PyAudio device indices
+        """
+        if cls._mic_names is None:
+            cls._mic_names = sr.Microphone.list_microphone_names()
+        return cls._mic_names
+    
+    @classmethod
+    def preferred_microphone_index(cls):
+        """
+        Return the device index of the preferred microphone.
+        
+        Returns:
+            int: Device index of the first array microphone, or None to use the default device
+        """
+        if cls._mic_index is None:
+            cls._mic_index = next(
+                (i for i, name in enumerate(cls.microphone_names()) if PREFERRED_MIC_RE.search(name)),
+                -1
+            )
+            if cls._mic_index >= 0:
+                log.info("已选择麦克风: %s (index %d)", cls._mic_names[cls._mic_index], cls._mic_index)
+        return cls._mic_index if cls._mic_index >= 0 else None
         
-    def adjust_for_ambient_noise(self, duration=1):
+    @classmethod
+    def microphone(cls):
+        """
+        Return the shared open microphone, opening it on first use.
+        
+        Keeping the PyAudio stream open avoids device setup on every turn.
+        
+        Returns:
+            speech_recognition.Microphone: An entered microphone source
+        """
+        with cls._source_lock:
+            if cls._source is None:
+                cls._source = open_microphone(cls.preferred_microphone_index())
+            return cls._source
+    
+    @classmethod
+    def close_microphone(cls):
+        """Close the shared microphone stream (it is reopened on next use)."""
+        with cls._source_lock:
+            if cls._source is not None:
+                try:
+                    cls._source.__exit__(None, None, None)
+                except Exception as e:
+                    print(f"Error closing microphone: {e}")
+                cls._source = None
+        
+    def adjust_for_ambient_noise(self, duration=1, force=False):
         """
         Adjust the recognizer sensitivity to ambient noise.
         
+        The measured threshold is kept, so later calls return immediately
+        unless force is set.
+        
         Args:
             duration: Number of seconds to sample ambient noise
+            force: Measure again even if already calibrated
         """
+        thread = self._calibration_thread
+        if thread is not None and thread is not threading.current_thread():
+            # A background calibration is running: wait for it instead of measuring again
+            thread.join()
+        if self.calibrated and not force:
+            return
         print(f"Adjusting for ambient noise... (Please be quiet for {duration} seconds)")
-        with sr.Microphone() as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=duration)
-            self.energy_threshold = self.recognizer.energy_threshold
-            print(f"Energy threshold set to {self.energy_threshold}")
+        source = self.microphone()
+        self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+        self.energy_threshold = self.recognizer.energy_threshold
+        self.calibrated = True
+        save_energy_threshold(self.energy_threshold)
+        log.debug("Energy threshold set to %s", self.energy_threshold)
     
-    def recognize_from_microphone(self):
+    def start_calibration(self, duration=1):
         """
-        Recognize speech from microphone.
+        Open the microphone and calibrate in a background thread.
+        
+        The next adjust_for_ambient_noise call waits for this thread only
+        if it is still running.
+        
+        Args:
+            duration: Number of seconds to sample ambient noise
+            
+        Returns:
+            threading.Thread: The calibration thread
+        """
+        def calibrate():
+            try:
+                self.adjust_for_ambient_noise(duration=duration)
+            except Exception as e:
+                print(f"\n⚠️ 无法调整环境噪音: {e}")
+        
+        if self._calibration_thread is None or not self._calibration_thread.is_alive():
+            self._calibration_thread = threading.Thread(target=calibrate, daemon=True)
+            self._calibration_thread.start()
+        return self._calibration_thread
+    
+    def listen(self, source, timeout=None, phrase_time_limit=None):
+        """
+        Record one phrase from an open microphone.
+        
+        Args:
+            source: Open speech_recognition.Microphone
+            timeout: Maximum seconds to wait for the phrase to start
+            phrase_time_limit: Maximum seconds for the phrase
+            
+        Returns:
+            AudioData: The recorded phrase
+        """
+        return listen_phrase(self.recognizer, source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+    
+    def recognize_audio(self, audio):
+        """
+        Recognize recorded audio, locally with Whisper when available.
         
+        Google's speech recognition API is used when faster-whisper is not
+        installed or the local model fails or hears nothing.
+        
+        Args:
+            audio: speech_recognition.AudioData to recognize
+            
         Returns:
             str: Recognized text, or empty string if recognition failed
         """
-        print(f"\n🎤 系统已就绪，随时可以开始说话...")
+        if WHISPER_AVAILABLE:
+            try:
+                text = transcribe_audio_data(audio, language=self.language)
+                if text:
+                    log.info("Recognized (local): %s", text)
+                    return text
+            except Exception as e:
+                log.warning("Local recognition failed, using Google instead: %s", e)
+        try:
+            # Sent through the shared keep-alive session
+            text = recognize_google(audio, language=self.language, timeout=self.recognizer.operation_timeout)
+            log.info("Recognized: %s", text)
+            return text
+        except sr.UnknownValueError:
+            log.info("Could not understand audio")
+            return ""
+        except sr.RequestError as e:
+            log.warning("Recognition error: %s", e)
+            return ""
+    
+    def recognize_continuously(self, callback, stop_event):
+        """
+        Keep listening and recognize each phrase while the next one is captured.
+        
+        Captured phrases are recognized on the shared recognition pool, so
+        the microphone keeps recording during each network round trip and
+        several phrases can be in flight at once. Results are still passed
+        to callback in the order they were spoken. Blocks until stop_event
+        is set.
+        
+        Args:
+            callback: Called with the text of each recognized phrase (from the worker thread)
+            stop_event: threading.Event that ends listening when set
+        """
+        result_queue = queue.Queue()
+        
+        def recognize_worker():
+            while True:
+                future = result_queue.get()
+                if future is None:
+                    return
+                try:
+                    text = future.result()
+                    if text:
+                        callback(text)
+                except Exception:
+                    # One failed phrase must not stop the phrases queued behind it
+                    log.exception("Error during background speech recognition")
         
+        worker = threading.Thread(target=recognize_worker, daemon=True)
+        worker.start()
         try:
-            print("\n📻 正在初始化麦克风...")
-            try:
-                # Get list of microphone devices
-                mic_list = sr.Microphone.list_microphone_names()
-                print(f"\nℹ️ 可用麦克风: {len(mic_list)} 个")
-                
-                if not mic_list:
-                    print("\n❌ 未检测到麦克风。请检查您的麦克风连接。")
-                    return ""
-                
-                # Try to find a suitable microphone - prefer ones with "array" in the name
-                mic_index = None
-                for i, name in enumerate(mic_list):
-                    if "麦克风阵列" in name.lower() and "input" not in name.lower():
-                        mic_index = i
-                        print(f"\n✅ 已选择麦克风: {name} (index {i})")
-                        break
-                
-                # Use the selected microphone or default
-                if mic_index is not None:
-                    print(f"\n🎤 正在使用麦克风 {mic_index}")
-                    with sr.Microphone(device_index=mic_index) as source:
-                        print("\n✅ 麦克风初始化成功")
-                        # Configure recognizer
-                        self.recognizer.energy_threshold = self.energy_threshold
-                        self.recognizer.dynamic_energy_threshold = self.dynamic_energy_threshold
-                        
-                        print("\n🔊 等待检测到语音...")
-                        # Remove timeout for phrase to start to give user more time
-                        # Only use phrase_time_limit to limit the length of the recording
-                        print("\n🔴 准备录音中... 请开始说话")
-                        start_time = time.time()
-                        
-                        # Add a message that we're listening
-                        print("\n🔵 正在倒听您的话语...", end="", flush=True)
-                        
-                        audio = self.recognizer.listen(
-                            source,
-                            phrase_time_limit=min(self.phrase_time_limit, 15) if self.phrase_time_limit else 15
-                        )
-                        duration = time.time() - start_time
-                        print(f"\n\n✅ 已捕捉音频 ({duration:.1f}秒)")
-                        print("\n🔍 正在识别语音...")
-                else:
-                    print("\n🎤 使用默认麦克风")
-                    with sr.Microphone() as source:
-                        print("\n✅ 麦克风初始化成功")
-                        # Configure recognizer
-                        self.recognizer.energy_threshold = self.energy_threshold
-                        self.recognizer.dynamic_energy_threshold = self.dynamic_energy_threshold
-                        
-                        print("\n🔊 等待检测到语音...")
-                        # Remove timeout for phrase to start to give user more time
-                        # Only use phrase_time_limit to limit the length of the recording
-                        print("\n🔴 准备录音中... 请开始说话")
-                        start_time = time.time()
-                        
-                        # Add a message that we're listening
-                        print("\n🔵 正在倒听您的话语...", end="", flush=True)
-                        
-                        audio = self.recognizer.listen(
-                            source,
-                            phrase_time_limit=min(self.phrase_time_limit, 15) if self.phrase_time_limit else 15
-                        )
-                        duration = time.time() - start_time
-                        print(f"\n\n✅ 已捕捉音频 ({duration:.1f}秒)")
-                        print("\n🔍 正在识别语音...")
-            except Exception as mic_error:
-                print(f"Microphone error: {mic_error}")
-                return ""
-                
-            # Try to recognize with Google's speech recognition API
-            try:
-                text = self.recognizer.recognize_google(audio, language=self.language)
-                timestamp = datetime.now().strftime("%H:%M:%S")
-                print(f"[{timestamp}] Recognized: {text}")
-                return text
-            except sr.UnknownValueError:
-                print("Could not understand audio")
-                return ""
-            except sr.RequestError as e:
-                print(f"Recognition error: {e}")
-                return ""
+            source = self.microphone()
+            self.recognizer.energy_threshold = self.energy_threshold
+            self.recognizer.dynamic_energy_threshold = self.dynamic_energy_threshold
+            while not stop_event.is_set():
+                try:
+                    # Short timeout so stop_event is checked regularly during silence
+                    audio = self.listen(source, timeout=1, phrase_time_limit=self.phrase_limit)
+                except sr.WaitTimeoutError:
+                    continue
+                result_queue.put(_STT_POOL.submit(self.recognize_audio, audio))
+        finally:
+            # Let the worker finish the queued phrases, then stop it
+            result_queue.put(None)
+            worker.join()
+    
+    def capture_phrase(self):
+        """
+        Record one phrase from the microphone.
+        
+        Returns:
+            AudioData: The recorded phrase, or None if nothing was recorded
+        """
+        # Prompts the user needs stay on the console; details go to the log
+        print("\n🎤 系统已就绪，随时可以开始说话...")
+        
+        log.debug("正在初始化麦克风...")
+        try:
+            # Get list of microphone devices
+            mic_list = self.microphone_names()
+            log.debug("可用麦克风: %d 个", len(mic_list))
+            
+            if not mic_list:
+                print("\n❌ 未检测到麦克风。请检查您的麦克风连接。")
+                return None
+            
+            # Use the preferred microphone (chosen once) or the default device
+            mic_index = self.preferred_microphone_index()
+            if mic_index is not None:
+                log.debug("正在使用麦克风 %d", mic_index)
+            else:
+                log.debug("使用默认麦克风")
                 
+            source = self.microphone()
+            log.debug("麦克风初始化成功")
+            # Configure recognizer
+            self.recognizer.energy_threshold = self.energy_threshold
+            self.recognizer.dynamic_energy_threshold = self.dynamic_energy_threshold
+            
+            # Remove timeout for phrase to start to give user more time
+            # Only use phrase_time_limit to limit the length of the recording
+            print("\n🔴 请开始说话...")
+            start_time = time.time()
+            
+            audio = self.listen(source, phrase_time_limit=self.phrase_limit)
+            duration = time.time() - start_time
+            log.debug("已捕捉音频 (%.1f秒)，正在识别语音...", duration)
+            return audio
         except sr.WaitTimeoutError:
-            print("No speech detected within timeout period")
+            log.info("No speech detected within timeout period")
+            return None
+        except Exception as mic_error:
+            log.warning("Microphone error: %s", mic_error)
+            # Reopen the stream next time in case the device went away
+            self.close_microphone()
+            return None
+    
+    def recognize_from_microphone(self):
+        """
+        Recognize speech from microphone.
+        
+        Returns:
+            str: Recognized text, or empty string if recognition failed
+        """
+        audio = self.capture_phrase()
+        if audio is None:
             return ""
-        except Exception as e:
-            print(f"Error during speech recognition: {e}")
-            import traceback
-            traceback.print_exc()
+        try:
+            # Recognize locally, or with Google's speech recognition API
+            return self.recognize_audio(audio)
+        except Exception:
+            log.exception("Error during speech recognition")
             return ""
     
     def recognize_from_file(self, audio_file):
@@ -163,23 +463,41 @@ class SpeechRecognizer:
             with sr.AudioFile(audio_file) as source:
                 audio = self.recognizer.record(source)
                 
-            # Try to recognize with Google's speech recognition API
-            try:
-                text = self.recognizer.recognize_google(audio, language=self.language)
-                print(f"Recognized: {text}")
-                return text
-            except sr.UnknownValueError:
-                print("Could not understand audio")
-                return ""
-            except sr.RequestError as e:
-                print(f"Recognition error: {e}")
-                return ""
+            # Recognize locally, or with Google's speech recognition API
+            return self.recognize_audio(audio)
                 
         except Exception as e:
             print(f"Error during file recognition: {e}")
             return ""
 
 
+atexit.register(SpeechRecognizer.close_microphone)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_recognizer(language, duration):
+    """Return the shared recognizer for a language and duration, keeping its calibration."""
+    return SpeechRecognizer(
+        language=language,
+        timeout=duration,
+        phrase_time_limit=duration
+    )
+
+
+def warm_up(duration=5, language="zh-CN"):
+    """
+    Calibrate the shared recognizer in the background before the first turn.
+    
+    Args:
+        duration: Maximum recording duration the caller will use
+        language: Language code the caller will use
+        
+    Returns:
+        threading.Thread: The calibration thread
+    """
+    return _get_recognizer(language, duration).start_calibration(duration=1)
+
+
 def record_and_transcribe(duration=5, language="zh-CN"):
     """
     Record audio from microphone and transcribe it to text.
@@ -193,14 +511,10 @@ def record_and_transcribe(duration=5, language="zh-CN"):
     """
     try:
         print("\n🔊 正在初始化语音识别系统...")
-        # Initialize recognizer
-        recognizer = SpeechRecognizer(
-            language=language,
-            timeout=duration,
-            phrase_time_limit=duration
-        )
+        # Reuse the recognizer from earlier turns
+        recognizer = _get_recognizer(language, duration)
         
-        # Adjust for ambient noise (optional)
+        # Adjust for ambient noise (optional, only measured on the first turn)
         try:
             recognizer.adjust_for_ambient_noise(duration=1)
         except Exception as e:
@@ -226,8 +540,42 @@ def record_and_transcribe(duration=5, language="zh-CN"):
             return ""
 
 
+def get_user_input(language="zh-CN"):
+    """
+    Get the user's message by voice, falling back to typed input.
+    
+    Args:
+        language: Language code for recognition
+        
+    Returns:
+        str: The recognized or typed text
+    """
+    text = record_and_transcribe(language=language)
+    
+    # Nothing recognized: ask for typed input instead
+    if not text:
+        print("\nSpeech recognition failed. Please type your message instead:")
+        try:
+            text = input("> ")
+        except (EOFError, KeyboardInterrupt):
+            return ""
+    return text
+
+
 # Test function
 if __name__ == "__main__":
-    print("Testing speech recognition...")
-    text = record_and_transcribe(duration=5)
-    print(f"Final result: '{text}'")
+    setup_logging(logging.DEBUG)
+    if "--continuous" in sys.argv:
+        # Print each phrase as it is recognized until Ctrl+C
+        print("Testing continuous speech recognition (Ctrl+C to stop)...")
+        stop = threading.Event()
+        try:
+            _get_recognizer("zh-CN", 5).recognize_continuously(
+                lambda text: print(f"Recognized: '{text}'"), stop
+            )
+        except KeyboardInterrupt:
+            stop.set()
+    else:
+        print("Testing speech recognition...")
+        text = record_and_transcribe(duration=5)
+        print(f"Final result: '{text}'")
@@ -6,19 +6,36 @@ import os
 import sys
 import time
 import platform
+import logging
+import functools
+import importlib.util
 import speech_recognition as sr
-import pyttsx3
-import pythoncom
-import win32com.client
 from datetime import datetime
+from voice_assistant.google_speech import recognize_google
+from voice_assistant.local_whisper import WHISPER_AVAILABLE, transcribe_audio_data
+from voice_assistant.logging_setup import STT_LOGGER_NAME, setup_logging
+from voice_assistant.real_speech_to_text import (
+    SpeechRecognizer, listen_phrase, load_energy_threshold, save_energy_threshold
+)
+
+__all__ = ["speech_recognition_with_fallback", "simple_record_from_microphone"]
+
+log = logging.getLogger(STT_LOGGER_NAME)
+
+
+@functools.lru_cache(maxsize=1)
+def windows_speech_available():
+    """
+    检查Windows语音支持（只在第一次调用时检查，且不导入COM模块）
+    
+    返回:
+        bool: pywin32、comtypes和pyttsx3都已安装时为True
+    """
+    return all(
+        importlib.util.find_spec(name) is not None
+        for name in ("pythoncom", "win32com", "comtypes", "pyttsx3")
+    )
 
-# 检查Windows语音支持
-try:
-    import win32com.client
-    import comtypes.client
-    WINDOWS_SPEECH_AVAILABLE = True
-except ImportError:
-    WINDOWS_SPEECH_AVAILABLE = False
 
 def simple_record_from_microphone(duration=5, language="zh-CN"):
     """
@@ -45,55 +62,71 @@ def simple_record_from_microphone(duration=5, language="zh-CN"):
         language_options = [language]
     
     try:
-        print("正在准备麦克风...")
-        with sr.Microphone() as source:
-            # 调整环境噪音
+        log.debug("正在准备麦克风...")
+        # 与real_speech_to_text共用同一个已打开的麦克风
+        source = SpeechRecognizer.microphone()
+        # 调整环境噪音（一小时内测过的阈值直接复用）
+        saved_threshold = load_energy_threshold()
+        if saved_threshold is not None:
+            recognizer.energy_threshold = saved_threshold
+        else:
             print("正在调整环境噪音... (请保持安静)")
             recognizer.adjust_for_ambient_noise(source, duration=1)
-            
-            # 提示用户开始说话
-            print(f"请开始说话, 说话完毕自动停止...")
+            save_energy_threshold(recognizer.energy_threshold)
+        
+        # 提示用户开始说话
+        print("请开始说话, 说话完毕自动停止...")
+        try:
+            audio = listen_phrase(recognizer, source, timeout=2, phrase_time_limit=duration)
+            log.debug("成功捕捉到语音，正在分析...")
+        except sr.WaitTimeoutError:
+            print("⚠️ 未检测到语音，请确保麦克风工作正常")
+            return ""
+        
+        # 优先使用本地Whisper模型识别，不需要网络请求
+        if WHISPER_AVAILABLE:
             try:
-                audio = recognizer.listen(source, timeout=2, phrase_time_limit=duration)
-                print("✔️ 成功捕捉到语音，正在分析...")
-            except sr.WaitTimeoutError:
-                print("⚠️ 未检测到语音，请确保麦克风工作正常")
-                return ""
-            
-            # 使用多种语言选项尝试
-            for lang in language_options:
-                try:
-                    print(f"正在使用Google语音识别 ({lang})...")
-                    text = recognizer.recognize_google(audio, language=lang)
-                    print(f"识别结果: {text}")
+                text = transcribe_audio_data(audio, language=language)
+                if text:
+                    log.info("本地识别结果: %s", text)
                     return text
-                except sr.UnknownValueError:
-                    print(f"{lang} 识别失败，尝试其他选项")
-                    continue
-                except sr.RequestError as e:
-                    print(f"Google语音识别服务错误: {e}")
-                    break
-            
-            # 如果在线识别失败，尝试使用Sphinx离线识别
+            except Exception as e:
+                log.warning("本地语音识别出错: %s，改用在线识别", e)
+        
+        # 使用多种语言选项尝试
+        for lang in language_options:
             try:
-                print("💻 尝试使用离线识别...")
-                text = recognizer.recognize_sphinx(audio)
-                print(f"💾 离线识别结果: {text}")
-                # 将英文转换为中文如果用户选择的是中文
-                if language.lower().startswith("zh") and text:
-                    print("注意: 离线识别结果可能不准确")
+                log.debug("正在使用Google语音识别 (%s)...", lang)
+                text = recognize_google(audio, language=lang)
+                log.info("识别结果: %s", text)
                 return text
-            except Exception as offline_err:
-                print(f"离线识别失败: {offline_err}")
-            
-            # 如果所有尝试都失败
-            print("所有识别方法均失败")
-            return ""
+            except sr.UnknownValueError:
+                log.debug("%s 识别失败，尝试其他选项", lang)
+                continue
+            except sr.RequestError as e:
+                log.warning("Google语音识别服务错误: %s", e)
+                break
+        
+        # 如果在线识别失败，尝试使用Sphinx离线识别
+        try:
+            log.debug("尝试使用离线识别...")
+            text = recognizer.recognize_sphinx(audio)
+            log.info("离线识别结果: %s", text)
+            # 将英文转换为中文如果用户选择的是中文
+            if language.lower().startswith("zh") and text:
+                log.info("注意: 离线识别结果可能不准确")
+            return text
+        except Exception as offline_err:
+            log.debug("离线识别失败: %s", offline_err)
+        
+        # 如果所有尝试都失败
+        log.info("所有识别方法均失败")
+        return ""
     
     except Exception as e:
-        print(f"语音识别总体错误: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("语音识别总体错误: %s", e)
+        # 设备可能已断开，下次重新打开麦克风
+        SpeechRecognizer.close_microphone()
         return ""
 
 def windows_native_speech(max_duration=10):
@@ -106,12 +139,17 @@ def windows_native_speech(max_duration=10):
     返回:
         str: 识别出的文本，或空字符串（如果识别失败）
     """
-    if not WINDOWS_SPEECH_AVAILABLE:
-        print("Windows语音识别不可用")
+    if not windows_speech_available():
+        log.warning("Windows语音识别不可用")
         return ""
+    
+    # COM和SAPI模块加载较慢，只在真正使用原生识别时导入
+    import pyttsx3
+    import pythoncom
+    import win32com.client
         
     try:
-        print("正在使用Windows原生语音识别...")
+        log.debug("正在使用Windows原生语音识别...")
         pythoncom.CoInitialize()
         
         # 提示准备开始
@@ -125,7 +163,7 @@ def windows_native_speech(max_duration=10):
         grammar.DictationSetState(1)  # 启用听写
         
         # 监听语音
-        print("正在监听Windows原生语音...")
+        log.debug("正在监听Windows原生语音...")
         start_time = time.time()
         
         # 简单等待一定时间
@@ -133,13 +171,11 @@ def windows_native_speech(max_duration=10):
         
         # 获取结果（这是一个简化实现）
         # 实际应用需要使用Windows事件处理
-        print("尝试获取识别结果...")
+        log.debug("尝试获取识别结果...")
         return "识别结果将在此显示"  # 在实际应用中，这里会返回实际的识别结果
     
     except Exception as e:
-        print(f"Windows语音识别错误: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Windows语音识别错误: %s", e)
         return ""
     finally:
         pythoncom.CoUninitialize()
@@ -172,21 +208,26 @@ def speech_recognition_with_fallback(duration=5, language="zh-CN"):
     print("尝试方法2: 使用直接的语音识别库...")
     recognizer = sr.Recognizer()
     try:
-        with sr.Microphone() as source:
-            print("请开始说话...")
+        source = SpeechRecognizer.microphone()
+        print("请开始说话...")
+        saved_threshold = load_energy_threshold()
+        if saved_threshold is not None:
+            recognizer.energy_threshold = saved_threshold
+        else:
             recognizer.adjust_for_ambient_noise(source, duration=1)
-            audio = recognizer.listen(source, timeout=2, phrase_time_limit=duration)
-            
-            try:
-                text = recognizer.recognize_google(audio, language=language)
-                print(f"方法2成功识别: '{text}'")
-                return text
-            except sr.UnknownValueError:
-                print("方法2无法识别音频")
-            except sr.RequestError as e:
-                print(f"方法2请求错误: {e}")
+        audio = listen_phrase(recognizer, source, timeout=2, phrase_time_limit=duration)
+        
+        try:
+            text = recognize_google(audio, language=language)
+            print(f"方法2成功识别: '{text}'")
+            return text
+        except sr.UnknownValueError:
+            print("方法2无法识别音频")
+        except sr.RequestError as e:
+            print(f"方法2请求错误: {e}")
     except Exception as e:
         print(f"方法2错误: {e}")
+        SpeechRecognizer.close_microphone()
     
     # 如果所有方法都失败，要求用户输入文本
     print("\n所有语音识别方法都失败。请输入您的消息:")
@@ -199,6 +240,7 @@ def speech_recognition_with_fallback(duration=5, language="zh-CN"):
 
 # 测试函数
 if __name__ == "__main__":
+    setup_logging(logging.DEBUG)
     print("测试Windows语音识别...")
     text = speech_recognition_with_fallback(duration=5)
     print(f"最终结果: '{text}'")
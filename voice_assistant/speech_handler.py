@@ -5,17 +5,27 @@ Automatically selects the best speech recognition method based on platform.
 import os
 import platform
 import sys
+import functools
+import importlib
 
-# Check platform
+# Check platform; the recognition module itself is imported on first use
 if platform.system() == 'Windows':
     # Use simplified Windows speech recognition
-    from .simple_windows_speech import speech_recognition_with_fallback as record_speech
+    SPEECH_MODULE, SPEECH_FUNCTION = ".simple_windows_speech", "speech_recognition_with_fallback"
     SPEECH_ENGINE = "Windows简化语音引擎"
 else:
     # Use standard speech recognition for other platforms
-    from .real_speech_to_text import record_and_transcribe as record_speech
+    SPEECH_MODULE, SPEECH_FUNCTION = ".real_speech_to_text", "record_and_transcribe"
     SPEECH_ENGINE = "标准语音引擎"
 
+
+@functools.lru_cache(maxsize=1)
+def _record_speech():
+    """Import the platform's recognition function once, on the first recording."""
+    module = importlib.import_module(SPEECH_MODULE, __package__)
+    return getattr(module, SPEECH_FUNCTION)
+
+
 def record_and_transcribe(duration=5, language="zh-CN"):
     """
     Platform-agnostic speech recognition function.
@@ -32,7 +42,7 @@ def record_and_transcribe(duration=5, language="zh-CN"):
     
     try:
         # Call the appropriate platform-specific function
-        text = record_speech(duration=duration, language=language)
+        text = _record_speech()(duration=duration, language=language)
         return text
     except Exception as e:
         print(f"语音识别错误: {e}")
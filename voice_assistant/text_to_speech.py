@@ -4,9 +4,37 @@ import base64
 import json
 import uuid
 import requests
-import pathlib
+from requests.adapters import HTTPAdapter
 import io
 import time
+import shutil
+import hashlib
+import threading
+from voice_assistant.paths import DATA_DIR
+
+# Synthesized audio is cached here, keyed by a hash of the text and voice
+TTS_CACHE_DIR = DATA_DIR / "tts_cache"
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+TTS_CACHE_PATTERNS = ("*.mp3", "*.wav")  # wav entries come from offline engines such as pyttsx3
+
+# Output directories already created by this process
+_CREATED_DIRS = set()
+
+# Running size of the cache in bytes (None until first measured), so inserts don't rescan the directory
+_cache_bytes = None
+_cache_lock = threading.Lock()
+
+# TTS endpoint
+TTS_HOST = "openspeech.bytedance.com"
+TTS_API_URL = f"https://{TTS_HOST}/api/v1/tts"
+
+# Shared session so TCP/TLS connections to the TTS host are reused across requests
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+# Voice settings shared by every request
+TTS_CLUSTER = "volcano_tts"
+TTS_VOICE_TYPE = "BV001_streaming"
 
 
 def split_text(text, max_length=100):
@@ -94,7 +122,7 @@ def synthesize_single_chunk(chunk, api_url, headers, credentials):
     
     try:
         print(f"\nProcessing text chunk ({len(chunk)} characters)...")
-        resp = requests.post(api_url, json.dumps(request_json), headers=headers)
+        resp = SESSION.post(api_url, json.dumps(request_json), headers=headers)
         
         if resp.status_code == 200 and "data" in resp.json():
             data = resp.json()["data"]
@@ -108,36 +136,233 @@ def synthesize_single_chunk(chunk, api_url, headers, credentials):
         return None
 
 
+def warm_up_connection():
+    """Open a connection to the TTS host ahead of time so the first request skips the handshake."""
+    try:
+        SESSION.head(f"https://{TTS_HOST}", timeout=5)
+    except requests.RequestException:
+        pass
+
+
+def _ensure_dir(path):
+    """Create a directory the first time it is needed in this process."""
+    if path not in _CREATED_DIRS:
+        path.mkdir(parents=True, exist_ok=True)
+        _CREATED_DIRS.add(path)
+
+
+def _cache_key(text):
+    """Return the cache key for a piece of text spoken with the current voice."""
+    key_source = f"{TTS_VOICE_TYPE}|{TTS_CLUSTER}|{text}"
+    return hashlib.blake2b(key_source.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _cache_tmp_path(cached_path):
+    """Return a unique temporary path next to a cache entry, to be renamed onto it once complete."""
+    return cached_path.with_name(f"{cached_path.stem}.{uuid.uuid4().hex}.tmp")
+
+
+def _scan_tts_cache():
+    """Return (stat, path) for every cache entry."""
+    return [
+        (entry.stat(), entry)
+        for pattern in TTS_CACHE_PATTERNS
+        for entry in TTS_CACHE_DIR.glob(pattern)
+    ]
+
+
+def _evict_tts_cache(added_path=None):
+    """
+    Account for a new cache entry and evict least recently used entries if the cache is over budget.
+    
+    The directory is only scanned the first time and when the budget is exceeded;
+    otherwise the new entry's size is added to a running total.
+    
+    Args:
+        added_path: Cache entry that was just written (None to only re-check the budget)
+    """
+    global _cache_bytes
+    with _cache_lock:
+        try:
+            if _cache_bytes is None:
+                # First use in this process: measure once (includes the new entry)
+                _cache_bytes = sum(st.st_size for st, _ in _scan_tts_cache())
+            elif added_path is not None:
+                _cache_bytes += added_path.stat().st_size
+            if _cache_bytes <= TTS_CACHE_MAX_BYTES:
+                return
+            entries = _scan_tts_cache()
+        except OSError:
+            return
+        total = sum(st.st_size for st, _ in entries)
+        # Oldest access time first
+        for st, entry in sorted(entries, key=lambda item: item[0].st_atime):
+            if total <= TTS_CACHE_MAX_BYTES:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+        _cache_bytes = total
+
+
 def synthesize_speech(text, output_filename):
     """
-    Convert text to speech using ByteDance TTS API.
+    Convert text to speech, reusing cached audio for text that was spoken before.
     
     Args:
         text: The text to convert to speech
         output_filename: The filename to save the audio to
     
     Returns:
-        bool: True if successful, False otherwise
+        str: Path of the written audio file if successful, None otherwise
+    """
+    output_path = DATA_DIR / output_filename
+    cached_path = TTS_CACHE_DIR / f"{_cache_key(' '.join(text.split()))}.mp3"
+    
+    # Cache hit: copy the stored audio instead of calling the API
+    if cached_path.is_file():
+        try:
+            _ensure_dir(output_path.parent)
+            shutil.copyfile(cached_path, output_path)
+            os.utime(cached_path)
+            print(f"\n√√ 使用缓存的语音，已保存至 {output_path}")
+            return str(output_path)
+        except OSError as e:
+            print(f"\n!! 读取语音缓存时出错: {e}")
+    
+    result, complete = _synthesize_speech_uncached(text, output_filename)
+    
+    # Failed or partial syntheses are not cached so they are retried next time
+    if result and complete:
+        # Copy then rename, so concurrent readers never see a partially written entry
+        tmp_path = _cache_tmp_path(cached_path)
+        try:
+            _ensure_dir(TTS_CACHE_DIR)
+            shutil.copyfile(output_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+            _evict_tts_cache(cached_path)
+        except OSError as e:
+            print(f"\n!! 写入语音缓存时出错: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+    return result
+
+
+def synthesize_speech_cached(text):
+    """
+    Return a cached audio file for the text, synthesizing it only on a cache miss.
+    
+    Unlike synthesize_speech, no per-call copy is written; callers play the
+    cache entry directly and must not modify or delete it.
+    
+    Args:
+        text: The text to convert to speech
+    
+    Returns:
+        str: Path of the cached audio file if successful, None otherwise
+    """
+    cache_key = _cache_key(' '.join(text.split()))
+    cached_path = TTS_CACHE_DIR / f"{cache_key}.mp3"
+    
+    if cached_path.is_file():
+        try:
+            os.utime(cached_path)
+        except OSError:
+            pass
+        print(f"\n√√ 使用缓存的语音: {cached_path}")
+        return str(cached_path)
+    
+    # Synthesize into a temporary file in the cache directory (output paths are relative to data/),
+    # then rename it, so callers never see and play a partially written entry
+    tmp_path = _cache_tmp_path(cached_path)
+    result, complete = _synthesize_speech_uncached(text, str(tmp_path.relative_to(DATA_DIR)))
+    if not result:
+        return None
+    if not complete:
+        # Some chunks were skipped: play it, but under a name that is never a cache hit
+        cached_path = TTS_CACHE_DIR / f"partial_{cache_key}.mp3"
+    try:
+        os.replace(tmp_path, cached_path)
+    except OSError as e:
+        print(f"\n!! 写入语音缓存时出错: {e}")
+        return str(tmp_path)
+    _evict_tts_cache(cached_path)
+    return str(cached_path)
+
+
+def synthesize_speech_bytes(text):
+    """
+    Return the speech audio for the text as in-memory mp3 bytes, using the cache.
+    
+    On a cache miss the audio is synthesized, stored in the cache and returned
+    without being read back from disk.
+    
+    Args:
+        text: The text to convert to speech
+    
+    Returns:
+        bytes: mp3 audio data if successful, None otherwise
+    """
+    cached_path = TTS_CACHE_DIR / f"{_cache_key(' '.join(text.split()))}.mp3"
+    
+    try:
+        audio_data = cached_path.read_bytes()
+        os.utime(cached_path)
+        print("\n√√ 使用缓存的语音")
+        return audio_data
+    except OSError:
+        pass
+    
+    audio_chunks, complete = _synthesize_audio_chunks(text)
+    if not audio_chunks:
+        return None
+    audio_data = b"".join(audio_chunks)
+    if not complete:
+        # Some chunks were skipped; don't keep the truncated audio for later replays
+        return audio_data
+    
+    # Keep a copy for next time; write then rename so readers never see a partial file
+    tmp_path = _cache_tmp_path(cached_path)
+    try:
+        _ensure_dir(TTS_CACHE_DIR)
+        tmp_path.write_bytes(audio_data)
+        os.replace(tmp_path, cached_path)
+        _evict_tts_cache(cached_path)
+    except OSError as e:
+        print(f"\n!! 写入语音缓存时出错: {e}")
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+    return audio_data
+
+
+def _synthesize_audio_chunks(text):
+    """
+    Convert text to speech using ByteDance TTS API.
+    
+    Args:
+        text: The text to convert to speech
+    
+    Returns:
+        tuple: (chunks, complete) - mp3 audio data of each synthesized chunk in order
+            (None on failure), and whether every part of the text was synthesized
     """
     # Get API credentials from environment variables
     credentials = {
         "appid": os.getenv("TTS_APPID", "1787492884"),
         "token": os.getenv("TTS_ACCESS_TOKEN", "j-akE7AtBfD1Erx0Ad9lDmX7o5lMfuY_"),
-        "cluster": "volcano_tts",
-        "voice_type": "BV001_streaming"
+        "cluster": TTS_CLUSTER,
+        "voice_type": TTS_VOICE_TYPE
     }
     
-    host = "openspeech.bytedance.com"
-    api_url = f"https://{host}/api/v1/tts"
+    api_url = TTS_API_URL
     headers = {"Authorization": f"Bearer;{credentials['token']}"}
     
-    # Ensure data directory exists
-    data_dir = pathlib.Path("data")
-    data_dir.mkdir(exist_ok=True)
-    
-    # Create full path for output file
-    output_path = data_dir / output_filename
-    
     # Clean the text (remove excess whitespace)
     text = " ".join(text.split())
     
@@ -150,7 +375,7 @@ def synthesize_speech(text, output_filename):
     if len(text_chunks) > 1:
         # For multiple chunks, process each one and combine the audio
         chunk_audio_data = []
-        success = True
+        complete = True
         
         for i, chunk in enumerate(text_chunks):
             print(f"\n>> 处理第 {i+1}/{len(text_chunks)} 块...")
@@ -167,43 +392,52 @@ def synthesize_speech(text, output_filename):
                     if sub_audio:
                         chunk_audio_data.append(sub_audio)
                     else:
-                        success = False
-                        print(f"\n!! 无法处理部分文本，已跳过")
+                        print("\n!! 无法处理部分文本，已跳过")
+                        complete = False
         
-        # Combine all audio chunks if we have any
-        if chunk_audio_data:
-            print(f"\n>> 正在合并 {len(chunk_audio_data)} 个音频块...")
-            try:
-                # Write all audio data to the output file
-                with open(output_path, "wb") as outfile:
-                    for audio_data in chunk_audio_data:
-                        outfile.write(audio_data)
-                        
-                print(f"\n√√ 语音合成完成，已保存至 {output_path}")
-                return True
-            except Exception as e:
-                print(f"\n!! 合并音频时出错: {e}")
-                return False
-        else:
+        if not chunk_audio_data:
             print("\n!! 没有成功生成任何音频块")
-            return False
+            return None, False
+        print(f"\n>> 正在合并 {len(chunk_audio_data)} 个音频块...")
+        return chunk_audio_data, complete
     else:
         # For a single chunk, just process directly
         print("\n>> 处理文本...")
         audio_data = synthesize_single_chunk(text_chunks[0], api_url, headers, credentials)
         
-        if audio_data:
-            try:
-                # Write audio data to the output file
-                with open(output_path, "wb") as outfile:
-                    outfile.write(audio_data)
-                print(f"\n√√ 语音合成完成，已保存至 {output_path}")
-                return True
-            except Exception as e:
-                print(f"\n!! 保存音频时出错: {e}")
-                return False
-        else:
+        if not audio_data:
             print("\n!! 文本处理失败")
-            return False
+            return None, False
+        return [audio_data], True
 
 
+def _synthesize_speech_uncached(text, output_filename):
+    """
+    Convert text to speech using ByteDance TTS API and save it to a file.
+    
+    Args:
+        text: The text to convert to speech
+        output_filename: The filename to save the audio to
+    
+    Returns:
+        tuple: (path, complete) - path of the written audio file (None on failure),
+            and whether every part of the text was synthesized
+    """
+    # Create full path for output file, making its directory on first use
+    output_path = DATA_DIR / output_filename
+    _ensure_dir(output_path.parent)
+    
+    audio_chunks, complete = _synthesize_audio_chunks(text)
+    if not audio_chunks:
+        return None, False
+    
+    try:
+        # Write all audio data to the output file
+        with open(output_path, "wb") as outfile:
+            for audio_data in audio_chunks:
+                outfile.write(audio_data)
+        print(f"\n√√ 语音合成完成，已保存至 {output_path}")
+        return str(output_path), complete
+    except Exception as e:
+        print(f"\n!! 保存音频时出错: {e}")
+        return None, False
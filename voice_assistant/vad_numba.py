@@ -0,0 +1,203 @@
+"""
+Energy-based voice activity detection for recorded clips and live input.
+
+Trims leading and trailing silence from a recording before it is sent for
+recognition, so less audio is uploaded and decoded, and detects phrases in
+a live microphone stream. The per-sample loops are compiled with numba when
+it is installed and run as plain Python otherwise.
+"""
+import math
+import collections
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Run the decorated function uncompiled when numba is missing."""
+        return lambda func: func
+
+
+@njit(cache=True, fastmath=True)
+def frame_energy(pcm, frame_len):
+    """
+    Compute the mean energy (mean square) of each full frame of int16 PCM.
+
+    Args:
+        pcm: 1-D int16 array of mono samples
+        frame_len: Number of samples per frame
+
+    Returns:
+        numpy.ndarray: One float64 energy value per frame
+    """
+    n_frames = pcm.shape[0] // frame_len
+    energy = np.empty(n_frames, dtype=np.float64)
+    for i in range(n_frames):
+        acc = 0.0
+        for j in range(i * frame_len, (i + 1) * frame_len):
+            sample = float(pcm[j])
+            acc += sample * sample
+        energy[i] = acc / frame_len
+    return energy
+
+
+@njit(cache=True, fastmath=True)
+def chunk_energy(pcm):
+    """
+    Compute the mean energy (mean square) of a chunk of int16 PCM.
+
+    Args:
+        pcm: 1-D int16 array of mono samples
+
+    Returns:
+        float: Mean square of the samples (0.0 for an empty chunk)
+    """
+    acc = 0.0
+    for i in range(pcm.shape[0]):
+        sample = float(pcm[i])
+        acc += sample * sample
+    return acc / max(1, pcm.shape[0])
+
+
+@njit(cache=True)
+def speech_bounds(energy, threshold, hangover):
+    """
+    Find the frames that contain speech.
+
+    Args:
+        energy: Per-frame energy from frame_energy
+        threshold: Energy above which a frame counts as speech
+        hangover: Frames of padding kept before the first and after the last speech frame
+
+    Returns:
+        tuple: (start_frame, end_frame) half-open range, or (0, 0) if no frame is speech
+    """
+    start = -1
+    end = -1
+    for i in range(energy.shape[0]):
+        if energy[i] > threshold:
+            if start < 0:
+                start = i
+            end = i
+    if start < 0:
+        return 0, 0
+    return max(0, start - hangover), min(energy.shape[0], end + 1 + hangover)
+
+
+def trim_silence(audio, energy_threshold, frame_ms=30, padding_ms=300):
+    """
+    Cut leading and trailing silence from a speech_recognition AudioData clip.
+
+    Args:
+        audio: speech_recognition.AudioData with 16-bit mono samples
+        energy_threshold: Recognizer energy threshold (RMS of int16 samples)
+        frame_ms: Analysis frame length in milliseconds
+        padding_ms: Audio kept around the detected speech, in milliseconds
+
+    Returns:
+        AudioData: The trimmed clip, or the original clip if nothing could be trimmed
+    """
+    if audio.sample_width != 2:
+        return audio
+
+    pcm = np.frombuffer(audio.get_raw_data(), dtype=np.int16)
+    frame_len = max(1, audio.sample_rate * frame_ms // 1000)
+    energy = frame_energy(pcm, frame_len)
+    start, end = speech_bounds(energy, float(energy_threshold) ** 2, padding_ms // frame_ms)
+
+    # No frame above the threshold: leave the decision to the recognizer
+    if end <= start or (start == 0 and end == energy.shape[0]):
+        return audio
+    trimmed = pcm[start * frame_len:end * frame_len]
+    return type(audio)(trimmed.tobytes(), audio.sample_rate, audio.sample_width)
+
+
+def listen(recognizer, source, timeout=None, phrase_time_limit=None):
+    """
+    Record one phrase from an open microphone, like speech_recognition's Recognizer.listen.
+
+    Uses the recognizer's thresholds and pause settings and updates its
+    dynamic energy threshold the same way, but measures each chunk with the
+    compiled chunk_energy instead of audioop in the Python loop.
+
+    Args:
+        recognizer: speech_recognition.Recognizer holding the detection settings
+        source: Open speech_recognition.Microphone with 16-bit samples
+        timeout: Maximum seconds to wait for the phrase to start (None waits forever)
+        phrase_time_limit: Maximum seconds for the phrase (None for no limit)
+
+    Returns:
+        AudioData: The recorded phrase
+
+    Raises:
+        speech_recognition.WaitTimeoutError: If no phrase started within timeout
+    """
+    import speech_recognition as sr
+
+    seconds_per_buffer = source.CHUNK / source.SAMPLE_RATE
+    # Chunks of silence that end a phrase, minimum chunks of speech, and silence kept around the phrase
+    pause_chunks = int(math.ceil(recognizer.pause_threshold / seconds_per_buffer))
+    phrase_chunks = int(math.ceil(recognizer.phrase_threshold / seconds_per_buffer))
+    non_speaking_chunks = int(math.ceil(recognizer.non_speaking_duration / seconds_per_buffer))
+
+    elapsed = 0.0
+    while True:
+        frames = collections.deque()
+
+        # Wait for the energy to rise above the threshold
+        while True:
+            elapsed += seconds_per_buffer
+            if timeout and elapsed > timeout:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+            buffer = source.stream.read(source.CHUNK)
+            if not buffer:
+                break
+            frames.append(buffer)
+            if len(frames) > non_speaking_chunks:
+                frames.popleft()
+
+            energy = chunk_energy(np.frombuffer(buffer, dtype=np.int16))
+            if energy > recognizer.energy_threshold ** 2:
+                break
+
+            # Follow the ambient noise level while nobody is speaking
+            if recognizer.dynamic_energy_threshold:
+                damping = recognizer.dynamic_energy_adjustment_damping ** seconds_per_buffer
+                target = math.sqrt(energy) * recognizer.dynamic_energy_ratio
+                recognizer.energy_threshold = recognizer.energy_threshold * damping + target * (1 - damping)
+
+        # Record until enough silence follows the speech
+        pause_count = 0
+        phrase_count = 0
+        phrase_start = elapsed
+        while True:
+            elapsed += seconds_per_buffer
+            if phrase_time_limit and elapsed - phrase_start > phrase_time_limit:
+                break
+
+            buffer = source.stream.read(source.CHUNK)
+            if not buffer:
+                break
+            frames.append(buffer)
+            phrase_count += 1
+
+            if chunk_energy(np.frombuffer(buffer, dtype=np.int16)) > recognizer.energy_threshold ** 2:
+                pause_count = 0
+            else:
+                pause_count += 1
+            if pause_count > pause_chunks:
+                break
+
+        # Too short to be speech: keep listening, unless the stream ended
+        phrase_count -= pause_count
+        if phrase_count >= phrase_chunks or not buffer:
+            break
+
+    # Drop the trailing silence beyond what is kept around the phrase
+    for _ in range(pause_count - non_speaking_chunks):
+        frames.pop()
+    return sr.AudioData(b"".join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
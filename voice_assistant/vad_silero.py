@@ -0,0 +1,90 @@
+"""
+Neural voice activity detection with Silero VAD for live microphone input.
+
+Ends a phrase as soon as the model reports the end of speech instead of
+waiting for the energy level to stay below the recognizer's threshold, so
+recordings stop sooner and carry less trailing silence. silero-vad (and
+torch) are optional; callers check SILERO_AVAILABLE and use the energy
+detector otherwise.
+"""
+import collections
+import functools
+import importlib.util
+
+# Checked without importing: torch is slow to load and only needed on first use
+SILERO_AVAILABLE = (
+    importlib.util.find_spec("silero_vad") is not None
+    and importlib.util.find_spec("numpy") is not None
+)
+
+# Silero VAD works on 512-sample frames of 16 kHz mono audio
+VAD_SAMPLE_RATE = 16000
+VAD_FRAME_SIZE = 512
+
+
+@functools.lru_cache(maxsize=1)
+def _get_model():
+    """Load the Silero VAD model once per process."""
+    from silero_vad import load_silero_vad
+    return load_silero_vad()
+
+
+def listen(recognizer, source, timeout=None, phrase_time_limit=None):
+    """
+    Record one phrase from an open microphone, like speech_recognition's Recognizer.listen.
+
+    The source must be a 16 kHz, 16-bit microphone. The recognizer's
+    pause_threshold sets how much silence ends the phrase and
+    non_speaking_duration how much audio is kept before it.
+
+    Args:
+        recognizer: speech_recognition.Recognizer holding the pause settings
+        source: Open speech_recognition.Microphone at VAD_SAMPLE_RATE
+        timeout: Maximum seconds to wait for the phrase to start (None waits forever)
+        phrase_time_limit: Maximum seconds for the phrase (None for no limit)
+
+    Returns:
+        AudioData: The recorded phrase
+
+    Raises:
+        speech_recognition.WaitTimeoutError: If no phrase started within timeout
+    """
+    import speech_recognition as sr
+    from silero_vad import VADIterator
+    from voice_assistant.pcm import i16_to_f32
+
+    vad_iterator = VADIterator(
+        _get_model(),
+        sampling_rate=VAD_SAMPLE_RATE,
+        min_silence_duration_ms=int(recognizer.pause_threshold * 1000)
+    )
+    seconds_per_frame = VAD_FRAME_SIZE / VAD_SAMPLE_RATE
+    # Audio kept from before the model noticed the speech start
+    frames = collections.deque(maxlen=max(1, int(recognizer.non_speaking_duration / seconds_per_frame)))
+
+    elapsed = 0.0
+    phrase_start = None
+    while True:
+        elapsed += seconds_per_frame
+        if phrase_start is None and timeout and elapsed > timeout:
+            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+        if phrase_start is not None and phrase_time_limit and elapsed - phrase_start > phrase_time_limit:
+            break
+
+        buffer = source.stream.read(VAD_FRAME_SIZE)
+        if len(buffer) < VAD_FRAME_SIZE * 2:
+            break
+        frames.append(buffer)
+
+        event = vad_iterator(i16_to_f32(buffer))
+        if not event:
+            continue
+        if "start" in event and phrase_start is None:
+            # Keep everything from here on
+            phrase_start = elapsed
+            frames = collections.deque(frames)
+        elif "end" in event and phrase_start is not None:
+            break
+
+    vad_iterator.reset_states()
+    return sr.AudioData(b"".join(frames), VAD_SAMPLE_RATE, 2)